@@ -5,19 +5,27 @@ Routes requests to appropriate backend services (TTS, LLM, Isotope Identificatio
 """
 
 import os
+import functools
 import logging
 import argparse
 import asyncio
 import json
+import shutil
 import time
 import uuid
-from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional, Any
 import httpx
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dev envs without orjson
+    orjson = None
+
 from fastapi import FastAPI, Request, Response, HTTPException, Depends, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, JSONResponse
+from starlette.background import BackgroundTask
 import uvicorn
 
 # Configure logging
@@ -65,68 +73,316 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# HTTP client for backend requests
-http_client = httpx.AsyncClient(timeout=BACKEND_TIMEOUT)
+# HTTP client for backend requests. HTTP/2 lets one connection multiplex many
+# concurrent proxied requests per backend; keepalive avoids cold handshakes.
+http_client = httpx.AsyncClient(
+    timeout=BACKEND_TIMEOUT,
+    transport=httpx.AsyncHTTPTransport(
+        retries=1,
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=256,
+            max_keepalive_connections=64,
+            keepalive_expiry=60.0,
+        ),
+    ),
+)
 
-# ============================================================================== 
+# Hop-by-hop headers stripped when forwarding requests/responses, and header
+# keys redacted in logs. Module-level frozensets keep the per-header check to
+# a single hash lookup on the hot path.
+_HOP_BY_HOP_REQ = frozenset({
+    "host",
+    "connection",
+    "keep-alive",
+    "transfer-encoding",
+    "proxy-authorization",
+    "proxy-authenticate",
+    "te",
+    "trailers",
+    "upgrade",
+})
+_HOP_BY_HOP_RESP = frozenset({
+    "transfer-encoding",
+    "connection",
+    "keep-alive",
+})
+_HOP_BY_HOP_RESP_RAW = frozenset(k.encode("latin-1") for k in _HOP_BY_HOP_RESP)
+_REDACT_HEADERS = frozenset({
+    "authorization",
+    "cookie",
+    "set-cookie",
+    "x-api-key",
+    "proxy-authorization",
+})
+_REDACT_HEADERS_RAW = frozenset(k.encode("latin-1") for k in _REDACT_HEADERS)
+
+# ==============================================================================
 # Ingress Logging Helpers
-# ============================================================================== 
+# ==============================================================================
+
+@functools.lru_cache(maxsize=4)
+def _fmt_utc_second(epoch_s: int) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(epoch_s))
+
 
 def _utc_now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat()
+    # Cheaper than datetime.now(timezone.utc).isoformat(): the seconds part is
+    # cached, so requests within the same second only format microseconds.
+    t = time.time()
+    s = int(t)
+    return f"{_fmt_utc_second(s)}.{int((t - s) * 1_000_000):06d}+00:00"
+
+
+def _json_dumps_bytes(obj: Any, pretty: bool = False) -> bytes:
+    """Serialize a log record to JSON bytes (orjson when available).
+
+    Records are stored compact; pretty-printing roughly doubles the bytes
+    written per log, so it is applied only at read time on request.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if pretty else None).encode("utf-8")
 
 
+def _json_loads_bytes(payload: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+@functools.lru_cache(maxsize=256)
 def _is_json_content_type(content_type: Optional[str]) -> bool:
+    # Content-type strings repeat heavily across requests, so the lower()
+    # plus substring checks are memoized per distinct value.
     if not content_type:
         return False
     ct = content_type.lower()
     return "application/json" in ct or ct.endswith("+json")
 
 
-def _try_parse_json_bytes(payload: bytes) -> Optional[Any]:
+def _try_parse_json_bytes(payload: "bytes | bytearray") -> Optional[Any]:
     if not payload:
         return None
     try:
-        return json.loads(payload.decode("utf-8"))
+        return _json_loads_bytes(payload)
     except Exception:
         return None
 
 
-def _redact_headers(headers: dict[str, str]) -> dict[str, str]:
-    redacted = {}
-    redact_keys = {
-        "authorization",
-        "cookie",
-        "set-cookie",
-        "x-api-key",
-        "proxy-authorization",
+def _decode_and_redact_raw(raw) -> dict[str, str]:
+    """Decode raw ASGI (bytes, bytes) headers straight into a redacted dict.
+
+    Raw keys are already lowercased, so redaction happens in the same pass as
+    decoding with no intermediate dict and no .lower() calls.
+    """
+    return {
+        k.decode("latin-1"): ("[redacted]" if k in _REDACT_HEADERS_RAW else v.decode("latin-1"))
+        for k, v in raw
     }
-    for key, value in headers.items():
-        if key.lower() in redact_keys:
-            redacted[key] = "[redacted]"
-        else:
-            redacted[key] = value
-    return redacted
 
 
-async def _write_log_record(record: dict[str, Any]) -> None:
-    if not INGRESS_LOG_ENABLED:
+# Bounded queue drained by a single writer task; avoids a thread-pool hop
+# and a tmp+rename pair per request on the hot path.
+INGRESS_LOG_QUEUE_MAXSIZE = int(os.getenv("VEGA_INGRESS_LOG_QUEUE_MAXSIZE", "10000"))
+INGRESS_LOG_BATCH_SIZE = int(os.getenv("VEGA_INGRESS_LOG_BATCH_SIZE", "256"))
+
+_log_queue: Optional[asyncio.Queue] = None
+_log_dropped_count = 0
+# Records are bucketed into hourly subdirectories (YYYYMMDDHH) so retention
+# cleanup removes whole expired hours instead of stat'ing every file. The
+# current hour's directory fd is kept open so record opens are dir_fd-relative
+# and skip full path resolution; it only rolls over once an hour.
+_log_hour: Optional[str] = None
+_log_hour_fd: Optional[int] = None
+
+
+def _hour_bucket(epoch: Optional[float] = None) -> str:
+    return time.strftime("%Y%m%d%H", time.gmtime(epoch))
+
+
+def _enqueue_log_record(record: dict[str, Any]) -> None:
+    global _log_dropped_count
+    if _log_queue is None:
         return
+    try:
+        _log_queue.put_nowait(record)
+    except asyncio.QueueFull:
+        _log_dropped_count += 1
+        if _log_dropped_count % 1000 == 1:
+            logger.warning(f"Ingress log queue full; dropped {_log_dropped_count} records so far")
 
-    INGRESS_LOG_DIR.mkdir(parents=True, exist_ok=True)
+
+def _write_record_to_disk(record: dict[str, Any]) -> None:
     log_id = record.get("id")
     if not log_id:
         return
 
-    tmp_path = INGRESS_LOG_DIR / f".{log_id}.json.tmp"
-    final_path = INGRESS_LOG_DIR / f"{log_id}.json"
-    payload = json.dumps(record, ensure_ascii=False, indent=2)
+    # Files are write-once keyed by UUID, so no tmp+rename is needed: nothing
+    # looks a record up before the middleware finishes writing it.
+    payload = _json_dumps_bytes(record)
+    try:
+        fd = _open_log_file(f"{log_id}.json")
+    except FileNotFoundError:
+        # Directory was removed out from under us; recreate and retry once.
+        _reopen_log_dir()
+        fd = _open_log_file(f"{log_id}.json")
+    try:
+        os.writev(fd, [payload])
+    finally:
+        os.close(fd)
+
+
+def _open_log_file(name: str) -> int:
+    global _log_hour, _log_hour_fd
+    hour = _hour_bucket()
+    if hour != _log_hour or _log_hour_fd is None:
+        hour_dir = INGRESS_LOG_DIR / hour
+        hour_dir.mkdir(parents=True, exist_ok=True)
+        if _log_hour_fd is not None:
+            try:
+                os.close(_log_hour_fd)
+            except OSError:
+                pass
+        _log_hour_fd = os.open(hour_dir, os.O_RDONLY | os.O_DIRECTORY)
+        _log_hour = hour
+    return os.open(name, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644, dir_fd=_log_hour_fd)
 
-    def _sync_write() -> None:
-        tmp_path.write_text(payload, encoding="utf-8")
-        tmp_path.replace(final_path)
 
-    await asyncio.to_thread(_sync_write)
+def _reopen_log_dir() -> None:
+    global _log_hour, _log_hour_fd
+    INGRESS_LOG_DIR.mkdir(parents=True, exist_ok=True)
+    if _log_hour_fd is not None:
+        try:
+            os.close(_log_hour_fd)
+        except OSError:
+            pass
+    # Force _open_log_file to recreate and reopen the current hour bucket.
+    _log_hour = None
+    _log_hour_fd = None
+
+
+# Optional io_uring backend (Linux >= 5.6): one syscall submits a whole batch
+# of log writes instead of open+write+close per record. Requires the liburing
+# Python bindings; falls back to the writev path if unavailable.
+INGRESS_LOG_IO_URING = os.getenv("VEGA_INGRESS_LOG_IO_URING", "0").lower() in {"1", "true", "yes", "on"}
+
+_uring = None
+# Submission-queue depth; the kernel rounds up to a power of two. Sized to
+# the configured batch so one drained batch fits in one submit, capped so an
+# oversized env value doesn't demand an unreasonable ring.
+_URING_DEPTH = min(max(INGRESS_LOG_BATCH_SIZE, 1), 1024)
+if INGRESS_LOG_IO_URING:
+    try:
+        import liburing
+
+        _uring = liburing.io_uring()
+        liburing.io_uring_queue_init(_URING_DEPTH, _uring, 0)
+    except Exception as e:  # pragma: no cover - depends on liburing install
+        logger.warning(f"io_uring log backend unavailable, using writev: {e}")
+        _uring = None
+
+
+def _write_batch_io_uring(batch: list[dict[str, Any]]) -> None:  # pragma: no cover
+    """Write a batch through the ring, one chunk of SQEs at a time.
+
+    Batches can exceed the ring depth (INGRESS_LOG_BATCH_SIZE is
+    env-tunable after the ring is sized), so records are submitted in
+    ring-depth-sized chunks, reaping completions between chunks.
+    """
+    for start in range(0, len(batch), _URING_DEPTH):
+        _submit_chunk_io_uring(batch[start:start + _URING_DEPTH])
+
+
+def _submit_chunk_io_uring(chunk: list[dict[str, Any]]) -> None:  # pragma: no cover
+    """Submit one write SQE per record and reap all completions at once."""
+    import liburing
+
+    fds = []
+    bufs = []  # keep payloads alive until completions are reaped
+    try:
+        for record in chunk:
+            log_id = record.get("id")
+            if not log_id:
+                continue
+            payload = _json_dumps_bytes(record)
+            # Same hour-bucket layout as the writev path, so /logs listing
+            # and retention cleanup see io_uring-written records too.
+            try:
+                fd = _open_log_file(f"{log_id}.json")
+            except FileNotFoundError:
+                _reopen_log_dir()
+                fd = _open_log_file(f"{log_id}.json")
+            fds.append(fd)
+            sqe = liburing.io_uring_get_sqe(_uring)
+            if not sqe:
+                # Ring full despite chunking (shouldn't happen, but never
+                # drop a log write): finish this record synchronously
+                os.writev(fd, [payload])
+                continue
+            bufs.append(payload)
+            liburing.io_uring_prep_write(sqe, fd, payload, len(payload), 0)
+        submitted = liburing.io_uring_submit(_uring)
+        cqe = liburing.io_uring_cqe()
+        for _ in range(submitted):
+            liburing.io_uring_wait_cqe(_uring, cqe)
+            liburing.io_uring_cqe_seen(_uring, cqe)
+    finally:
+        for fd in fds:
+            os.close(fd)
+
+
+def _sync_log_dir_once() -> None:
+    """Flush directory metadata once per batch rather than per record."""
+    if _log_hour_fd is None:
+        return
+    try:
+        os.fdatasync(_log_hour_fd)
+    except OSError:
+        pass
+
+
+def _write_batch(batch: list[dict[str, Any]]) -> None:
+    """Write one drained batch and flush directory metadata; blocking."""
+    if _uring is not None:
+        _write_batch_io_uring(batch)
+    else:
+        for record in batch:
+            _write_record_to_disk(record)
+    _sync_log_dir_once()
+
+
+async def _log_writer_loop() -> None:
+    assert _log_queue is not None
+    while True:
+        batch = [await _log_queue.get()]
+        while len(batch) < INGRESS_LOG_BATCH_SIZE:
+            try:
+                batch.append(_log_queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        try:
+            # The open/writev/fdatasync calls block, and under light load
+            # a batch is a single record - keep them off the event loop
+            # so proxying never stalls on a log fsync
+            await asyncio.to_thread(_write_batch, batch)
+        except Exception as e:
+            logger.warning(f"Failed to write ingress log batch: {e}")
+
+
+def _drain_log_queue() -> None:
+    """Flush whatever is still queued; called on shutdown."""
+    if _log_queue is None:
+        return
+    while True:
+        try:
+            record = _log_queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        try:
+            _write_record_to_disk(record)
+        except Exception:
+            pass
 
 
 async def _cleanup_old_logs_once() -> int:
@@ -136,19 +392,27 @@ async def _cleanup_old_logs_once() -> int:
         return 0
 
     cutoff_epoch = time.time() - (INGRESS_LOG_RETENTION_HOURS * 3600.0)
+    cutoff_hour = _hour_bucket(cutoff_epoch)
     deleted = 0
 
     try:
         if not INGRESS_LOG_DIR.exists():
             return 0
 
-        for path in INGRESS_LOG_DIR.glob("*.json"):
-            try:
-                if path.stat().st_mtime < cutoff_epoch:
-                    path.unlink(missing_ok=True)
-                    deleted += 1
-            except Exception:
-                continue
+        # Hour buckets sort lexicographically, so expiry is a name compare and
+        # one rmtree per expired hour - no per-file stat calls.
+        with os.scandir(INGRESS_LOG_DIR) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir() and entry.name.isdigit() and entry.name < cutoff_hour:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                        deleted += 1
+                    elif entry.name.endswith(".json") and entry.stat().st_mtime < cutoff_epoch:
+                        # Legacy flat-layout records from before hour bucketing.
+                        os.unlink(entry.path)
+                        deleted += 1
+                except Exception:
+                    continue
     except Exception:
         return deleted
 
@@ -171,122 +435,154 @@ def _require_logs_token(x_vega_logs_token: Optional[str] = Header(default=None,
         raise HTTPException(status_code=401, detail="Missing or invalid logs token")
 
 
-async def _capture_response_json_body(response: Response) -> tuple[Optional[Any], Optional[int], bool, Response]:
-    """Return (parsed_json, bytes_logged, truncated, response_to_return)."""
-    content_type = response.headers.get("content-type")
-    if not _is_json_content_type(content_type):
-        return None, None, False, response
-
-    # Fast path for non-streaming responses.
-    body_bytes: Optional[bytes] = getattr(response, "body", None)
-    if body_bytes is not None and not isinstance(response, StreamingResponse):
-        truncated = len(body_bytes) > INGRESS_LOG_MAX_BODY_BYTES
-        body_for_log = body_bytes[:INGRESS_LOG_MAX_BODY_BYTES]
-        return _try_parse_json_bytes(body_for_log), len(body_for_log), truncated, response
-
-    # StreamingResponse: buffer to return the same content.
-    full_body = b""
-    async for chunk in response.body_iterator:
-        full_body += chunk
-
-    # Rebuild response; drop content-length to avoid mismatch.
-    headers = dict(response.headers)
-    headers.pop("content-length", None)
-    rebuilt = Response(
-        content=full_body,
-        status_code=response.status_code,
-        headers=headers,
-        media_type=response.media_type,
-        background=getattr(response, "background", None),
-    )
-
-    truncated = len(full_body) > INGRESS_LOG_MAX_BODY_BYTES
-    body_for_log = full_body[:INGRESS_LOG_MAX_BODY_BYTES]
-    return _try_parse_json_bytes(body_for_log), len(body_for_log), truncated, rebuilt
-
-
-# ============================================================================== 
+# ==============================================================================
 # Ingress Logging Middleware
-# ============================================================================== 
+# ==============================================================================
 
 
-@app.middleware("http")
-async def ingress_disk_logger(request: Request, call_next):
-    if not INGRESS_LOG_ENABLED:
-        return await call_next(request)
-
-    request_id = request.headers.get("x-request-id") or str(uuid.uuid4())
-    start = time.perf_counter()
-
-    request_headers = _redact_headers(dict(request.headers))
-    request_content_type = request.headers.get("content-type")
-
-    request_json: Optional[Any] = None
-    request_body_len: Optional[int] = None
-    request_truncated = False
-    if _is_json_content_type(request_content_type):
-        body = await request.body()
-        request_body_len = len(body)
-        request_truncated = request_body_len > INGRESS_LOG_MAX_BODY_BYTES
-        request_json = _try_parse_json_bytes(body[:INGRESS_LOG_MAX_BODY_BYTES])
-
-    response = await call_next(request)
-    duration_ms = (time.perf_counter() - start) * 1000.0
-
-    # Ensure request ID is visible to clients.
-    response.headers["x-request-id"] = request_id
-
-    response_json, response_bytes_logged, response_truncated, response_to_return = await _capture_response_json_body(response)
-    response_content_type = response.headers.get("content-type")
-
-    record = {
-        "id": request_id,
-        "ts_utc": _utc_now_iso(),
-        "duration_ms": round(duration_ms, 3),
-        "request": {
-            "method": request.method,
-            "path": request.url.path,
-            "query": str(request.url.query) if request.url.query else "",
-            "client": getattr(request.client, "host", None),
-            "headers": request_headers,
-            "content_type": request_content_type,
-            "json": request_json,
-            "body_bytes": request_body_len,
-            "body_truncated": request_truncated,
-        },
-        "response": {
-            "status_code": response.status_code,
-            "content_type": response_content_type,
-            "headers": _redact_headers(dict(response.headers)),
-            "json": response_json,
-            "body_bytes_logged": response_bytes_logged,
-            "body_truncated": response_truncated,
-        },
-    }
+class IngressDiskLoggerMiddleware:
+    """Pure ASGI middleware that logs requests/responses to disk.
 
-    try:
-        await _write_log_record(record)
-    except Exception as e:
-        logger.warning(f"Failed to write ingress log: {e}")
+    Works directly on ASGI messages instead of Starlette's BaseHTTPMiddleware,
+    so responses stream through unbuffered and no per-request Request/Response
+    objects are built for the logging path.
+    """
 
-    return response_to_return
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not INGRESS_LOG_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        # Decode and redact in one pass; x-request-id and content-type are not
+        # redacted keys, so they can be read back out of the logged dict.
+        req_headers = _decode_and_redact_raw(scope["headers"])
+        request_id = req_headers.get("x-request-id") or str(uuid.uuid4())
+        request_content_type = req_headers.get("content-type")
+        # No body is expected for these methods; skip the receive tee entirely.
+        capture_request = (
+            scope["method"] not in ("GET", "HEAD", "DELETE", "OPTIONS")
+            and _is_json_content_type(request_content_type)
+        )
+
+        start = time.perf_counter()
+
+        req_buf = bytearray()
+        req_total = 0
+
+        async def receive_wrap():
+            nonlocal req_total
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                req_total += len(body)
+                if len(req_buf) < INGRESS_LOG_MAX_BODY_BYTES:
+                    req_buf.extend(body[: INGRESS_LOG_MAX_BODY_BYTES - len(req_buf)])
+            return message
+
+        resp_status: Optional[int] = None
+        resp_headers: dict[str, str] = {}
+        resp_buf = bytearray()
+        resp_total = 0
+        capture_response = False
+
+        async def send_wrap(message):
+            nonlocal resp_status, resp_headers, resp_total, capture_response
+            if message["type"] == "http.response.start":
+                headers = message.setdefault("headers", [])
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                resp_status = message["status"]
+                resp_headers = _decode_and_redact_raw(headers)
+                capture_response = _is_json_content_type(resp_headers.get("content-type"))
+            elif message["type"] == "http.response.body" and capture_response:
+                body = message.get("body", b"")
+                resp_total += len(body)
+                if len(resp_buf) < INGRESS_LOG_MAX_BODY_BYTES:
+                    resp_buf.extend(body[: INGRESS_LOG_MAX_BODY_BYTES - len(resp_buf)])
+            await send(message)
+
+        await self.app(scope, receive_wrap if capture_request else receive, send_wrap)
+        duration_ms = (time.perf_counter() - start) * 1000.0
+
+        client = scope.get("client")
+        query = scope.get("query_string", b"")
+
+        record = {
+            "id": request_id,
+            "ts_utc": _utc_now_iso(),
+            "duration_ms": round(duration_ms, 3),
+            "request": {
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": query.decode("latin-1") if query else "",
+                "client": client[0] if client else None,
+                "headers": req_headers,
+                "content_type": request_content_type,
+                "json": _try_parse_json_bytes(req_buf) if capture_request else None,
+                "body_bytes": req_total if capture_request else None,
+                "body_truncated": req_total > INGRESS_LOG_MAX_BODY_BYTES,
+            },
+            "response": {
+                "status_code": resp_status,
+                "content_type": resp_headers.get("content-type"),
+                "headers": resp_headers,
+                "json": _try_parse_json_bytes(resp_buf) if capture_response else None,
+                "body_bytes_logged": len(resp_buf) if capture_response else None,
+                "body_truncated": resp_total > INGRESS_LOG_MAX_BODY_BYTES,
+            },
+        }
+
+        # Hand off to the writer task; never blocks the response path.
+        _enqueue_log_record(record)
+
+
+app.add_middleware(IngressDiskLoggerMiddleware)
 
 
 @app.on_event("startup")
 async def _on_startup() -> None:
+    global _log_queue
     if INGRESS_LOG_ENABLED:
-        INGRESS_LOG_DIR.mkdir(parents=True, exist_ok=True)
+        _reopen_log_dir()
+        _log_queue = asyncio.Queue(maxsize=INGRESS_LOG_QUEUE_MAXSIZE)
+        app.state._ingress_log_writer_task = asyncio.create_task(_log_writer_loop())
         app.state._ingress_cleanup_task = asyncio.create_task(_cleanup_loop())
+    asyncio.create_task(_warm_backend_pools())
+
+
+async def _warm_backend_pools() -> None:
+    """Open a keepalive connection to each backend so the first proxied
+    request does not pay the TCP/TLS handshake."""
+
+    async def _warm(url: str) -> None:
+        try:
+            await http_client.head(f"{url}/health", timeout=5)
+        except Exception:
+            pass
+
+    await asyncio.gather(_warm(TTS_BACKEND), _warm(LLM_BACKEND), _warm(ISOTOPE_BACKEND))
 
 
 @app.on_event("shutdown")
 async def _on_shutdown() -> None:
-    try:
-        task = getattr(app.state, "_ingress_cleanup_task", None)
-        if task:
-            task.cancel()
-    except Exception:
-        pass
+    for attr in ("_ingress_log_writer_task", "_ingress_cleanup_task"):
+        try:
+            task = getattr(app.state, attr, None)
+            if task:
+                task.cancel()
+        except Exception:
+            pass
+    _drain_log_queue()
+    global _log_hour_fd, _log_hour
+    if _log_hour_fd is not None:
+        try:
+            os.close(_log_hour_fd)
+        except OSError:
+            pass
+        _log_hour_fd = None
+        _log_hour = None
     try:
         await http_client.aclose()
     except Exception:
@@ -296,32 +592,27 @@ async def _on_shutdown() -> None:
 # Health & Info
 # ==============================================================================
 
+async def _probe_backend(name: str, url: str) -> tuple[str, dict]:
+    try:
+        resp = await http_client.get(f"{url}/health", timeout=5)
+        if resp.status_code == 200:
+            return name, resp.json()
+        return name, {"status": "error", "code": resp.status_code}
+    except Exception as e:
+        return name, {"status": "unreachable", "error": str(e)}
+
+
 @app.get("/health")
 async def health_check():
     """Health check - also checks backend connectivity."""
-    backends = {}
-    
-    # Check TTS
-    try:
-        resp = await http_client.get(f"{TTS_BACKEND}/health", timeout=5)
-        backends["tts"] = resp.json() if resp.status_code == 200 else {"status": "error", "code": resp.status_code}
-    except Exception as e:
-        backends["tts"] = {"status": "unreachable", "error": str(e)}
-    
-    # Check LLM
-    try:
-        resp = await http_client.get(f"{LLM_BACKEND}/health", timeout=5)
-        backends["llm"] = resp.json() if resp.status_code == 200 else {"status": "error", "code": resp.status_code}
-    except Exception as e:
-        backends["llm"] = {"status": "unreachable", "error": str(e)}
-    
-    # Check Isotope Identification
-    try:
-        resp = await http_client.get(f"{ISOTOPE_BACKEND}/health", timeout=5)
-        backends["isotope"] = resp.json() if resp.status_code == 200 else {"status": "error", "code": resp.status_code}
-    except Exception as e:
-        backends["isotope"] = {"status": "unreachable", "error": str(e)}
-    
+    # Probe all backends concurrently so a dead one doesn't serialize the rest.
+    results = await asyncio.gather(
+        _probe_backend("tts", TTS_BACKEND),
+        _probe_backend("llm", LLM_BACKEND),
+        _probe_backend("isotope", ISOTOPE_BACKEND),
+    )
+    backends = dict(results)
+
     all_healthy = all(
         b.get("status") in ["healthy", "ok"] 
         for b in backends.values()
@@ -380,12 +671,26 @@ async def list_logs(
     if not INGRESS_LOG_DIR.exists():
         return {"count": 0, "logs": []}
 
-    # Sort newest-first by mtime.
-    paths = sorted(INGRESS_LOG_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    # Walk hour buckets newest-first and stop once `limit` records are
+    # collected, so old hours are never touched. scandir serves cached stat
+    # info, and only the selected files get parsed.
+    with os.scandir(INGRESS_LOG_DIR) as it:
+        hour_dirs = sorted((e.path for e in it if e.is_dir() and e.name.isdigit()), reverse=True)
+
+    entries: list[tuple[float, str]] = []
+    for hour_dir in hour_dirs:
+        with os.scandir(hour_dir) as it:
+            bucket = [(e.stat().st_mtime, e.path) for e in it if e.name.endswith(".json")]
+        bucket.sort(reverse=True)
+        entries.extend(bucket)
+        if len(entries) >= limit:
+            break
+
     logs = []
-    for path in paths[:limit]:
+    for _, entry_path in entries[:limit]:
         try:
-            record = json.loads(path.read_text(encoding="utf-8"))
+            with open(entry_path, "rb") as f:
+                record = _json_loads_bytes(f.read())
             logs.append(
                 {
                     "id": record.get("id"),
@@ -405,6 +710,7 @@ async def list_logs(
 @app.get("/logs/{log_id}")
 async def get_log(
     log_id: str,
+    pretty: bool = Query(default=False),
     _: None = Depends(_require_logs_token),
 ):
     """Retrieve a single ingress log record by ID."""
@@ -417,15 +723,32 @@ async def get_log(
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid log ID")
 
-    path = INGRESS_LOG_DIR / f"{log_id}.json"
-    if not path.exists():
+    # Search hour buckets newest-first; fall back to the legacy flat layout.
+    path = None
+    try:
+        with os.scandir(INGRESS_LOG_DIR) as it:
+            hour_dirs = sorted((e.path for e in it if e.is_dir() and e.name.isdigit()), reverse=True)
+    except OSError:
+        hour_dirs = []
+    for hour_dir in hour_dirs:
+        candidate = Path(hour_dir) / f"{log_id}.json"
+        if candidate.exists():
+            path = candidate
+            break
+    if path is None:
+        legacy = INGRESS_LOG_DIR / f"{log_id}.json"
+        if legacy.exists():
+            path = legacy
+    if path is None:
         raise HTTPException(status_code=404, detail="Log not found")
 
     try:
-        record = json.loads(path.read_text(encoding="utf-8"))
+        record = _json_loads_bytes(path.read_bytes())
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to read log")
 
+    if pretty:
+        return Response(content=_json_dumps_bytes(record, pretty=True), media_type="application/json")
     return JSONResponse(record)
 
 # ==============================================================================
@@ -447,34 +770,41 @@ async def proxy_request(
     # Get request body
     body = await request.body()
     
-    # Forward headers (excluding hop-by-hop headers)
-    headers = {}
-    for key, value in request.headers.items():
-        if key.lower() not in ["host", "connection", "keep-alive", "transfer-encoding"]:
-            headers[key] = value
+    # Forward headers (excluding hop-by-hop headers). Starlette stores raw
+    # header keys lowercased, so no per-key .lower() is needed.
+    headers = [
+        (key, value)
+        for key, value in request.headers.raw
+        if key.decode("latin-1") not in _HOP_BY_HOP_REQ
+    ]
     
     try:
-        # Make request to backend
-        response = await http_client.request(
+        # Stream the backend response through instead of buffering it; TTS
+        # audio and batch spectra can be large.
+        backend_req = http_client.build_request(
             method=request.method,
             url=target_url,
             content=body,
             headers=headers,
         )
-        
-        # Build response headers
-        response_headers = {}
-        for key, value in response.headers.items():
-            if key.lower() not in ["transfer-encoding", "connection", "content-encoding"]:
-                response_headers[key] = value
-        
-        return Response(
-            content=response.content,
-            status_code=response.status_code,
-            headers=response_headers,
-            media_type=response.headers.get("content-type")
+        backend_resp = await http_client.send(backend_req, stream=True)
+
+        # Raw (undecoded) bytes pass straight through, so content-encoding and
+        # content-length stay valid; drop only the hop-by-hop headers. The raw
+        # (bytes, bytes) list is assigned directly rather than round-tripping
+        # through a str dict that Starlette would just re-encode.
+        response = StreamingResponse(
+            backend_resp.aiter_raw(),
+            status_code=backend_resp.status_code,
+            background=BackgroundTask(backend_resp.aclose),
         )
-        
+        response.raw_headers = [
+            (key, value)
+            for key, value in backend_resp.headers.raw
+            if key.lower() not in _HOP_BY_HOP_RESP_RAW
+        ]
+        return response
+
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="Backend timeout")
     except httpx.ConnectError:
@@ -483,34 +813,6 @@ async def proxy_request(
         logger.error(f"Proxy error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# ==============================================================================
-# TTS Routes
-# ==============================================================================
-
-@app.api_route("/tts/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
-async def proxy_tts(request: Request, path: str):
-    """Proxy requests to TTS service."""
-    return await proxy_request(request, TTS_BACKEND, path)
-
-@app.api_route("/api/tts/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
-async def proxy_api_tts(request: Request, path: str):
-    """Alias: Proxy requests to TTS service."""
-    return await proxy_request(request, TTS_BACKEND, path)
-
-# ==============================================================================
-# LLM Routes
-# ==============================================================================
-
-@app.api_route("/llm/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
-async def proxy_llm(request: Request, path: str):
-    """Proxy requests to LLM service."""
-    return await proxy_request(request, LLM_BACKEND, path)
-
-@app.api_route("/api/llm/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
-async def proxy_api_llm(request: Request, path: str):
-    """Alias: Proxy requests to LLM service."""
-    return await proxy_request(request, LLM_BACKEND, path)
-
 # ==============================================================================
 # Convenience Routes (direct access to common endpoints)
 # ==============================================================================
@@ -545,20 +847,6 @@ async def spectrogram(request: Request):
     """
     return await proxy_request(request, LLM_BACKEND, "spectrogram")
 
-# ==============================================================================
-# Isotope Identification Routes
-# ==============================================================================
-
-@app.api_route("/isotope/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
-async def proxy_isotope(request: Request, path: str):
-    """Proxy requests to Isotope Identification service."""
-    return await proxy_request(request, ISOTOPE_BACKEND, path)
-
-@app.api_route("/api/isotope/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
-async def proxy_api_isotope(request: Request, path: str):
-    """Alias: Proxy requests to Isotope Identification service."""
-    return await proxy_request(request, ISOTOPE_BACKEND, path)
-
 # Direct convenience routes for isotope identification
 @app.post("/identify")
 async def identify(request: Request):
@@ -597,6 +885,34 @@ async def list_isotopes(request: Request):
     """Direct route to list all supported isotopes."""
     return await proxy_request(request, ISOTOPE_BACKEND, "isotopes")
 
+# ==============================================================================
+# Service Proxy Routes
+# ==============================================================================
+
+# One parametric route per family replaces the six per-service handlers, so
+# the router walks two Route objects instead of six on every match.
+BACKEND_MAP = {
+    "tts": TTS_BACKEND,
+    "llm": LLM_BACKEND,
+    "isotope": ISOTOPE_BACKEND,
+}
+
+@app.api_route("/api/{service}/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
+async def proxy_api_service(request: Request, service: str, path: str):
+    """Alias: Proxy requests to a backend service (tts, llm, isotope)."""
+    backend = BACKEND_MAP.get(service)
+    if backend is None:
+        raise HTTPException(status_code=404, detail=f"Unknown service: {service}")
+    return await proxy_request(request, backend, path)
+
+@app.api_route("/{service}/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
+async def proxy_service(request: Request, service: str, path: str):
+    """Proxy requests to a backend service (tts, llm, isotope)."""
+    backend = BACKEND_MAP.get(service)
+    if backend is None:
+        raise HTTPException(status_code=404, detail=f"Unknown service: {service}")
+    return await proxy_request(request, backend, path)
+
 # ==============================================================================
 # Main
 # ==============================================================================
@@ -7,6 +7,7 @@ Simple script to run inference with a trained Vega model.
 
 import sys
 import argparse
+import json
 from pathlib import Path
 
 # Add project root to path
@@ -14,6 +15,7 @@ PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 from inference.vega_inference import run_inference_demo, VegaInference
+from inference.server import default_socket_path, request_over_socket, serve
 
 
 def main():
@@ -45,7 +47,13 @@ def main():
         default=None,
         help="Path to a specific spectrum file to analyze"
     )
-    
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Keep the loaded model resident behind a Unix socket; later "
+             "--spectrum invocations reuse it instead of reloading"
+    )
+
     args = parser.parse_args()
     
     # Make paths absolute
@@ -53,27 +61,53 @@ def main():
     if not model_path.is_absolute():
         model_path = PROJECT_ROOT / model_path
     
-    if args.spectrum:
+    if args.serve:
+        # Server mode - load once, answer requests over a Unix socket
+        serve(str(model_path))
+
+    elif args.spectrum:
         # Single spectrum inference
         spectrum_path = Path(args.spectrum)
         if not spectrum_path.is_absolute():
             spectrum_path = PROJECT_ROOT / spectrum_path
-        
+
+        print(f"\nAnalyzing spectrum: {spectrum_path}")
+        if default_socket_path().exists():
+            # A resident server may be up - skip the model load entirely.
+            # The socket file can outlive a killed server, so a failed
+            # connection falls through to the local load below.
+            try:
+                result = request_over_socket(
+                    spectrum_path, threshold=args.threshold
+                )
+            except OSError as e:
+                print(f"Inference server unreachable ({e}); "
+                      f"loading model locally")
+                try:
+                    default_socket_path().unlink()
+                except OSError:
+                    pass
+            else:
+                print("\n" + "=" * 60)
+                print("PREDICTION RESULTS (via server)")
+                print("=" * 60)
+                print(json.dumps(result, indent=2))
+                print("=" * 60)
+                return 0
+
         print(f"\nLoading model from: {model_path}")
         inference = VegaInference(str(model_path))
-        
-        print(f"\nAnalyzing spectrum: {spectrum_path}")
         prediction = inference.predict_from_file(
-            spectrum_path, 
+            spectrum_path,
             threshold=args.threshold
         )
-        
+
         print("\n" + "=" * 60)
         print("PREDICTION RESULTS")
         print("=" * 60)
         print(prediction.summary())
         print("=" * 60)
-        
+
     else:
         # Demo mode - analyze all spectra in data directory
         data_path = Path(args.data)
@@ -0,0 +1,111 @@
+"""
+Vega Inference Server
+
+Keeps a loaded VegaInference resident behind a Unix domain socket so
+repeated CLI invocations skip the checkpoint load (seconds per call) and
+pay only the inference time.
+
+Protocol: one JSON request per line, one JSON response per line.
+Request:  {"file": "/path/to/spectrum.npy", "threshold": 0.5}
+Response: SpectrumPrediction.to_dict(), or {"error": "..."} on failure.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import sys
+from pathlib import Path
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import numpy as np
+
+
+def default_socket_path() -> Path:
+    """Socket location: $XDG_RUNTIME_DIR/vega.sock, falling back to /tmp."""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR', '/tmp')
+    return Path(runtime_dir) / "vega.sock"
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handles one connection: read a JSON line, predict, write JSON back."""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            threshold = float(request.get('threshold', 0.5))
+            prediction = self.server.inference.predict_from_file(
+                request['file'], threshold=threshold
+            )
+            response = prediction.to_dict()
+        except Exception as e:
+            response = {'error': str(e)}
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class VegaInferenceServer(socketserver.UnixStreamServer):
+    """Unix-socket server wrapping a resident VegaInference engine."""
+
+    def __init__(self, inference, socket_path=None):
+        self.inference = inference
+        self.socket_path = Path(socket_path or default_socket_path())
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        super().__init__(str(self.socket_path), _RequestHandler)
+
+        # Pre-warm with a zero spectrum so the first real request does not
+        # pay the torch.compile / kernel autotune cost.
+        dummy = np.zeros(
+            inference.model_config.num_channels, dtype=np.float32
+        )
+        inference.predict(dummy)
+
+    def server_close(self):
+        super().server_close()
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+
+
+def request_over_socket(
+    file_path, threshold: float = 0.5, socket_path=None
+) -> dict:
+    """
+    Send a prediction request to a running server.
+
+    Raises OSError if no server is listening on the socket.
+    """
+    socket_path = Path(socket_path or default_socket_path())
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(str(socket_path))
+        request = {'file': str(Path(file_path).resolve()), 'threshold': threshold}
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            if chunk.endswith(b"\n"):
+                break
+    return json.loads(b"".join(chunks))
+
+
+def serve(model_path, socket_path=None):
+    """Load the model once and serve predictions until interrupted."""
+    from inference.vega_inference import VegaInference
+
+    inference = VegaInference(model_path)
+    server = VegaInferenceServer(inference, socket_path)
+    print(f"Serving on {server.socket_path} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down")
+    finally:
+        server.server_close()
@@ -5,10 +5,18 @@ Load a trained Vega model and run inference on gamma spectra to identify
 isotopes and estimate their activities.
 """
 
+import os
 import sys
 import json
 import numpy as np
 import torch
+from collections import deque
+
+try:
+    import orjson
+except ImportError:  # optional fast path; stdlib json works fine
+    orjson = None
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Union
 from dataclasses import dataclass, asdict
@@ -21,6 +29,25 @@ from training.vega.model import VegaModel, VegaConfig
 from training.vega.isotope_index import IsotopeIndex
 
 
+def _as_tensor(a: np.ndarray) -> torch.Tensor:
+    """
+    Convert an array to a tensor, zero-copy when possible.
+
+    torch.from_numpy shares memory with the array, so contiguous writable
+    FP32 input (the common case from np.load) costs no allocation or
+    memcpy; anything else is fixed up first. Callers chasing maximum
+    throughput should hand in contiguous FP32 arrays directly.
+    """
+    if a.dtype != np.float32:
+        a = a.astype(np.float32, copy=False)
+    if not a.flags['C_CONTIGUOUS']:
+        a = np.ascontiguousarray(a)
+    if not a.flags.writeable:
+        # from_numpy refuses read-only buffers (e.g. mmap'd files)
+        a = a.copy()
+    return torch.from_numpy(a)
+
+
 @dataclass
 class IsotopePrediction:
     """Prediction for a single isotope."""
@@ -37,11 +64,28 @@ class SpectrumPrediction:
     num_present: int
     confidence: float
     threshold_used: float
-    
+    # Raw arrays aligned with `isotopes`, stashed by the predict paths so
+    # to_dict can round vectorized instead of per-isotope round() calls.
+    _probs: Optional[np.ndarray] = None
+    _activities: Optional[np.ndarray] = None
+
     def to_dict(self) -> Dict:
         """Convert to dictionary."""
-        return {
-            'isotopes': [
+        if self._probs is not None:
+            # float64 before rounding so tolist() yields clean decimals
+            probs = np.round(self._probs.astype(np.float64), 4).tolist()
+            acts = np.round(self._activities.astype(np.float64), 2).tolist()
+            isotope_dicts = [
+                {
+                    'name': iso.name,
+                    'probability': p,
+                    'activity_bq': a,
+                    'present': iso.present
+                }
+                for iso, p, a in zip(self.isotopes, probs, acts)
+            ]
+        else:
+            isotope_dicts = [
                 {
                     'name': iso.name,
                     'probability': round(iso.probability, 4),
@@ -49,7 +93,9 @@ class SpectrumPrediction:
                     'present': iso.present
                 }
                 for iso in self.isotopes
-            ],
+            ]
+        return {
+            'isotopes': isotope_dicts,
             'num_isotopes_detected': self.num_present,
             'confidence': round(self.confidence, 4),
             'threshold': self.threshold_used
@@ -74,10 +120,30 @@ class SpectrumPrediction:
         return "\n".join(lines)
 
 
+class _InferenceHead(torch.nn.Module):
+    """
+    Model plus sigmoid and threshold mask as one module.
+
+    Keeping sigmoid and the >= comparison inside the compiled/traced graph
+    lets them fuse with the final layers, and the boolean presence mask
+    transfers at 1 byte per isotope instead of a 4-byte FP32 probability.
+    The threshold is a tensor argument so it stays dynamic across calls.
+    """
+
+    def __init__(self, model: torch.nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, x: torch.Tensor, threshold: torch.Tensor):
+        logits, activities = self.model(x)
+        probs = torch.sigmoid(logits)
+        return probs, activities, probs >= threshold
+
+
 class VegaInference:
     """
     Inference engine for the Vega model.
-    
+
     Loads a trained model and provides methods for running predictions
     on gamma spectra.
     """
@@ -86,16 +152,28 @@ class VegaInference:
         self,
         model_path: Union[str, Path],
         isotope_index_path: Optional[Union[str, Path]] = None,
-        device: Optional[torch.device] = None
+        device: Optional[torch.device] = None,
+        precision: Optional[str] = None,
+        compile_model: bool = True,
+        cpu_quantize: bool = True
     ):
         """
         Initialize the inference engine.
-        
+
         Args:
             model_path: Path to the saved model checkpoint
             isotope_index_path: Path to isotope index file. If None, will try
                                to find it in the same directory as the model.
             device: Device to run inference on. If None, uses CUDA if available.
+            precision: 'fp32', 'fp16', or 'bf16'. If None, defaults to bf16 on
+                      Ampere-or-newer CUDA devices and fp32 everywhere else.
+            compile_model: If True, JIT-compile the model at init (torch.compile,
+                          falling back to torch.jit.script, then eager). The
+                          compile cost is paid once here via a warm-up forward.
+            cpu_quantize: If True and running on CPU, apply dynamic INT8
+                         quantization to the Linear layers (uses VNNI/NEON
+                         dot-product paths; detection thresholds are
+                         insensitive to the quantization error).
         """
         self.model_path = Path(model_path)
         
@@ -120,20 +198,114 @@ class VegaInference:
             self.device = torch.device('cpu')
             print("Using CPU for inference")
         
-        # Load checkpoint
+        # Pick inference precision. BF16 autocast halves memory bandwidth and
+        # engages Tensor Cores on Ampere+ GPUs; FP32 stays the safe default
+        # elsewhere.
+        if precision is None:
+            if self.device.type == 'cuda' and torch.cuda.get_device_capability(self.device)[0] >= 8:
+                precision = 'bf16'
+            else:
+                precision = 'fp32'
+        if precision not in ('fp32', 'fp16', 'bf16'):
+            raise ValueError(f"Unknown precision: {precision}")
+        self.precision = precision
+        self._autocast_dtype = {
+            'fp32': None,
+            'fp16': torch.float16,
+            'bf16': torch.bfloat16,
+        }[precision]
+        torch.set_float32_matmul_precision('high')
+
+        # Load checkpoint. weights_only restricts unpickling to tensors and
+        # plain containers (no arbitrary code execution) and mmap maps the
+        # file so tensors inference never touches - optimizer/scheduler
+        # state in training checkpoints - are never read off disk.
         print(f"Loading model from: {self.model_path}")
-        self.checkpoint = torch.load(self.model_path, map_location=self.device)
-        
+        checkpoint = torch.load(
+            self.model_path,
+            map_location=self.device,
+            weights_only=True,
+            mmap=True,
+        )
+
         # Load model config
-        model_config_dict = self.checkpoint['model_config']
-        self.model_config = VegaConfig(**model_config_dict)
-        
+        self.model_config = VegaConfig(**checkpoint['model_config'])
+
         # Create and load model
         self.model = VegaModel(self.model_config)
-        self.model.load_state_dict(self.checkpoint['model_state_dict'])
+        self.model.load_state_dict(checkpoint['model_state_dict'])
         self.model = self.model.to(self.device)
         self.model.eval()
-        
+        # Release the checkpoint dict promptly; everything needed is copied
+        # into the model by now
+        del checkpoint
+
+        # Fold the activity scale into the regressor's final Linear so the
+        # model emits Bq directly and the predict paths skip a per-call
+        # multiply. Valid because the regressor ends Linear -> ReLU and
+        # ReLU(s*x) == s*ReLU(x) for s > 0. Must happen before quantization
+        # freezes the Linear weights.
+        self._activity_scale_folded = False
+        scale = self.model_config.max_activity_bq
+        if scale > 0:
+            final_linear = None
+            for module in self.model.regressor:
+                if isinstance(module, torch.nn.Linear):
+                    final_linear = module
+            if final_linear is not None:
+                with torch.no_grad():
+                    final_linear.weight.mul_(scale)
+                    if final_linear.bias is not None:
+                        final_linear.bias.mul_(scale)
+                self._activity_scale_folded = True
+        self._activity_scale = 1.0 if self._activity_scale_folded else scale
+
+        # Keep the plain eager module around for ONNX export; the quantized
+        # or compiled wrappers below are not exportable.
+        self._eager_model = self.model
+        self.session = None  # set by from_onnx()
+
+        # CPU fallback path: dynamic INT8 quantization of the dense heads cuts
+        # memory bandwidth 4x per Linear layer.
+        self.quantized = False
+        if cpu_quantize and self.device.type == 'cpu':
+            try:
+                self.model = torch.ao.quantization.quantize_dynamic(
+                    self.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+                self.quantized = True
+            except Exception as e:
+                print(f"Dynamic quantization unavailable, keeping FP32: {e}")
+
+        # Sigmoid + threshold mask live inside the head module so they
+        # compile into the same graph as the model itself.
+        self.head = _InferenceHead(self.model)
+
+        # Compile for fixed-shape inference; the first (warm-up) call below
+        # absorbs the one-time compile cost so user calls stay fast.
+        self.compiled = False
+        if compile_model:
+            eager_head = self.head
+            try:
+                self.head = torch.compile(self.head, mode='reduce-overhead', fullgraph=False)
+                self.compiled = True
+            except Exception:
+                try:
+                    self.head = torch.jit.script(eager_head)
+                    self.compiled = True
+                except Exception as e:
+                    self.head = eager_head
+                    print(f"Model compilation unavailable, running eager: {e}")
+            if self.compiled:
+                try:
+                    with torch.inference_mode():
+                        dummy = torch.zeros((1, self.model_config.num_channels), device=self.device)
+                        self.head(dummy, torch.tensor(0.5, device=self.device))
+                except Exception as e:
+                    self.head = eager_head
+                    self.compiled = False
+                    print(f"Compiled warm-up failed, running eager: {e}")
+
         # Load isotope index
         if isotope_index_path is None:
             # Try to find in same directory
@@ -147,44 +319,246 @@ class VegaInference:
             self.isotope_index = get_default_isotope_index()
             print("Warning: Using default isotope index")
         
+        # Cache the index->name mapping once; predict paths index this
+        # tuple instead of calling index_to_name per isotope per spectrum.
+        # The object-dtype array variant supports fancy/mask indexing.
+        self._names = tuple(
+            self.isotope_index.index_to_name(i)
+            for i in range(self.isotope_index.num_isotopes)
+        )
+        self._names_arr = np.asarray(self._names, dtype=object)
+
+        # Reusable output buffers for CUDA: stacking probs+activities into
+        # one device tensor and copying into pinned host memory gives one
+        # D2H transfer and one sync per call instead of two of each.
+        if self.device.type == 'cuda':
+            n = self.model_config.num_isotopes
+            self._dev_out = torch.empty((2, n), device=self.device)
+            self._host_out = torch.empty((2, n), pin_memory=True)
+        else:
+            self._dev_out = None
+            self._host_out = None
+
         print(f"Model loaded successfully!")
         print(f"Device: {self.device}")
         print(f"Isotopes: {self.isotope_index.num_isotopes}")
     
+    def export_onnx(self, path: Union[str, Path]) -> Path:
+        """
+        Export the model to ONNX for use with ONNX Runtime.
+
+        ONNX Runtime has lower per-call dispatch overhead than PyTorch eager
+        and applies graph-level constant folding/fusion, which typically cuts
+        CPU latency 1.5-3x. Load the result with VegaInference.from_onnx().
+
+        Args:
+            path: Destination .onnx file path
+
+        Returns:
+            The path the model was written to
+        """
+        path = Path(path)
+        dummy = torch.zeros(
+            (1, self.model_config.num_channels), device=self.device
+        )
+        torch.onnx.export(
+            self._eager_model,
+            dummy,
+            str(path),
+            input_names=['spectrum'],
+            output_names=['logits', 'activities'],
+            dynamic_axes={
+                'spectrum': {0: 'batch'},
+                'logits': {0: 'batch'},
+                'activities': {0: 'batch'},
+            },
+        )
+        return path
+
+    @classmethod
+    def from_onnx(
+        cls,
+        onnx_path: Union[str, Path],
+        isotope_index_path: Optional[Union[str, Path]] = None,
+        max_activity_bq: float = 1000.0
+    ) -> "VegaInference":
+        """
+        Create an inference engine backed by ONNX Runtime instead of PyTorch.
+
+        predict/predict_batch work unchanged; the forward pass goes through
+        onnxruntime.InferenceSession (CUDA provider when available, CPU
+        otherwise), bypassing PyTorch dispatch entirely.
+
+        Args:
+            onnx_path: Path to a model exported with export_onnx()
+            isotope_index_path: Path to isotope index file. If None, will try
+                               to find it next to the ONNX file.
+            max_activity_bq: Activity normalization constant the model was
+                            trained with (VegaConfig.max_activity_bq)
+
+        Returns:
+            VegaInference instance running on ONNX Runtime
+        """
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError(
+                "onnxruntime is required for from_onnx(); "
+                "install with: pip install onnxruntime"
+            ) from e
+
+        onnx_path = Path(onnx_path)
+        print(f"Loading ONNX model from: {onnx_path}")
+
+        self = cls.__new__(cls)
+        self.model_path = onnx_path
+        self.device = torch.device('cpu')
+        self.precision = 'fp32'
+        self._autocast_dtype = None
+        self.quantized = False
+        self.compiled = False
+        self.model = None
+        self._eager_model = None
+        self.head = None
+        self._dev_out = None
+        self._host_out = None
+        # export_onnx exports the folded eager model, so the graph already
+        # emits Bq directly
+        self._activity_scale_folded = True
+        self._activity_scale = 1.0
+
+        self.session = onnxruntime.InferenceSession(
+            str(onnx_path),
+            providers=['CUDAExecutionProvider', 'CPUExecutionProvider'],
+        )
+
+        # Recover model dimensions from the graph instead of the checkpoint
+        num_channels = self.session.get_inputs()[0].shape[1]
+        num_isotopes = self.session.get_outputs()[0].shape[1]
+        self.model_config = VegaConfig(
+            num_channels=num_channels,
+            num_isotopes=num_isotopes,
+            max_activity_bq=max_activity_bq,
+        )
+
+        # Load isotope index
+        if isotope_index_path is None:
+            isotope_index_path = onnx_path.parent / "vega_isotope_index.txt"
+
+        if Path(isotope_index_path).exists():
+            self.isotope_index = IsotopeIndex.load(Path(isotope_index_path))
+        else:
+            from training.vega.isotope_index import get_default_isotope_index
+            self.isotope_index = get_default_isotope_index()
+            print("Warning: Using default isotope index")
+
+        self._names = tuple(
+            self.isotope_index.index_to_name(i)
+            for i in range(self.isotope_index.num_isotopes)
+        )
+        self._names_arr = np.asarray(self._names, dtype=object)
+
+        print(f"ONNX model loaded successfully!")
+        print(f"Providers: {self.session.get_providers()}")
+        print(f"Isotopes: {self.isotope_index.num_isotopes}")
+        return self
+
     def preprocess_spectrum(
         self,
-        spectrum: np.ndarray,
+        spectrum: Union[np.ndarray, torch.Tensor],
         normalize: bool = True
     ) -> torch.Tensor:
         """
         Preprocess a spectrum for inference.
-        
+
         Args:
-            spectrum: Input spectrum array. Can be:
+            spectrum: Input spectrum. NumPy arrays can be:
                      - 1D: (channels,) - single spectrum
                      - 2D: (time, channels) - will be averaged over time
+                     Tensors can be (channels,) or already-batched
+                     (batch, channels); they get the same normalization and
+                     device transfer as arrays, so callers no longer need to
+                     pre-process tensors themselves.
             normalize: Whether to normalize to [0, 1]
-            
+
         Returns:
-            Preprocessed tensor ready for model
+            Preprocessed (batch, channels) tensor on the inference device
         """
-        # Handle 2D spectra
-        if spectrum.ndim == 2:
-            spectrum = spectrum.mean(axis=0)
-        
-        # Normalize
-        if normalize and spectrum.max() > 0:
-            spectrum = spectrum / spectrum.max()
-        
-        # Convert to tensor
-        tensor = torch.tensor(spectrum, dtype=torch.float32)
-        
+        if isinstance(spectrum, torch.Tensor):
+            tensor = spectrum.float()
+        else:
+            # Handle 2D spectra. asarray resolves a memmap-backed input into
+            # one contiguous FP32 buffer here rather than page-faulting
+            # downstream.
+            if spectrum.ndim == 2:
+                spectrum = np.asarray(spectrum.mean(axis=0), dtype=np.float32)
+            tensor = _as_tensor(spectrum)
+
         # Add batch dimension
-        tensor = tensor.unsqueeze(0)
-        
-        return tensor.to(self.device)
-    
-    @torch.no_grad()
+        if tensor.ndim == 1:
+            tensor = tensor.unsqueeze(0)
+
+        if tensor.device != self.device:
+            tensor = tensor.to(self.device)
+
+        if normalize:
+            # Branchless on-device normalize; the clamp keeps all-zero
+            # spectra unchanged instead of dividing by zero.
+            tensor = tensor / tensor.amax(dim=-1, keepdim=True).clamp_min(1e-12)
+
+        return tensor
+
+    def preprocess_batch(
+        self,
+        spectra: List[np.ndarray],
+        normalize: bool = True
+    ) -> torch.Tensor:
+        """
+        Preprocess multiple spectra into a single (N, channels) batch tensor.
+
+        Args:
+            spectra: List of spectrum arrays (1D or 2D, see preprocess_spectrum)
+            normalize: Whether to normalize each spectrum to [0, 1]
+
+        Returns:
+            Batched tensor of shape (N, channels) on the inference device
+        """
+        reduced = [s.mean(axis=0) if s.ndim == 2 else s for s in spectra]
+        batch = np.stack(reduced).astype(np.float32, copy=False)
+
+        if normalize:
+            maxima = batch.max(axis=1, keepdims=True)
+            np.divide(batch, maxima, out=batch, where=maxima > 0)
+
+        tensor = torch.from_numpy(batch)
+        if self.device.type == 'cuda':
+            # Pinned staging buffer makes the H2D copy async so it overlaps
+            # with host-side work on the next batch.
+            tensor = tensor.pin_memory()
+        return tensor.to(self.device, non_blocking=True)
+
+    def _forward(self, x: torch.Tensor, threshold: float) -> tuple:
+        """Run the inference head, under autocast when reduced precision is
+        enabled.
+
+        Returns (probs, activities, present_mask); probs and activities are
+        cast back to FP32 so thresholding keeps full numerical stability.
+        """
+        if self.session is not None:
+            logits, activities = self.session.run(
+                None, {'spectrum': x.cpu().numpy()}
+            )
+            probs = torch.sigmoid(torch.from_numpy(logits))
+            return probs, torch.from_numpy(activities), probs >= threshold
+
+        thr = torch.as_tensor(threshold, device=x.device)
+        if self._autocast_dtype is not None:
+            with torch.autocast(device_type=self.device.type, dtype=self._autocast_dtype):
+                probs, activities, mask = self.head(x, thr)
+            return probs.float(), activities.float(), mask
+        return self.head(x, thr)
+
+    @torch.inference_mode()
     def predict(
         self,
         spectrum: Union[np.ndarray, torch.Tensor],
@@ -203,68 +577,148 @@ class VegaInference:
         Returns:
             SpectrumPrediction with isotope predictions
         """
-        # Preprocess if numpy
-        if isinstance(spectrum, np.ndarray):
-            spectrum = self.preprocess_spectrum(spectrum)
-        
-        # Run model (outputs logits)
-        logits, activities = self.model(spectrum)
-        
-        # Apply sigmoid to get probabilities
-        probs = torch.sigmoid(logits)
-        
-        # Convert to numpy
-        probs = probs.cpu().numpy()[0]
-        activities = activities.cpu().numpy()[0]
-        
-        # Scale activities
-        activities = activities * self.model_config.max_activity_bq
-        
-        # Create predictions
-        isotopes = []
-        for i in range(len(probs)):
-            prob = float(probs[i])
-            activity = float(activities[i])
-            present = prob >= threshold
-            
-            if return_all or present:
-                isotopes.append(IsotopePrediction(
-                    name=self.isotope_index.index_to_name(i),
-                    probability=prob,
-                    activity_bq=activity if present else 0.0,
-                    present=present
-                ))
-        
+        # Preprocess uniformly; tensors get the same normalization and
+        # device placement as arrays (and skip the copy if already there)
+        spectrum = self.preprocess_spectrum(spectrum)
+
+
+        # Run the head (sigmoid + threshold happen in-graph)
+        probs, activities, mask = self._forward(spectrum, threshold)
+        probs = probs[0]
+
+        if not return_all:
+            # The mask was computed on-device; transfer only the present
+            # isotopes - typically a handful out of the full index.
+            present_idx = torch.nonzero(mask[0], as_tuple=True)[0]
+            # One stacked D2H copy for probs+activities instead of two
+            stacked = torch.stack((
+                probs[present_idx],
+                activities[0, present_idx] * self._activity_scale,
+            )).cpu().numpy()
+            present_probs, present_acts = stacked[0], stacked[1]
+
+            isotopes = [
+                IsotopePrediction(
+                    name=self._names[i],
+                    probability=float(p),
+                    activity_bq=float(a),
+                    present=True
+                )
+                for i, p, a in zip(present_idx.tolist(), present_probs, present_acts)
+            ]
+
+            if isotopes:
+                confidence = float(present_probs.mean())
+            else:
+                confidence = 1.0 - float(probs.max())  # Confidence in "background only"
+
+            return SpectrumPrediction(
+                isotopes=isotopes,
+                num_present=len(isotopes),
+                confidence=confidence,
+                threshold_used=threshold,
+                _probs=present_probs,
+                _activities=present_acts
+            )
+
+        # return_all: bring everything back and build the full list. On CUDA
+        # the stacked copy lands in the pinned buffer allocated at init - one
+        # transfer, one explicit sync.
+        scaled_acts = activities[0] * self._activity_scale
+        if self._host_out is not None:
+            torch.stack((probs, scaled_acts), out=self._dev_out)
+            self._host_out.copy_(self._dev_out, non_blocking=True)
+            torch.cuda.synchronize()
+            # The pinned buffer is reused across calls; copy out the rows
+            out = self._host_out.numpy()
+            probs, activities = out[0].copy(), out[1].copy()
+        else:
+            stacked = torch.stack((probs, scaled_acts)).cpu().numpy()
+            probs, activities = stacked[0], stacked[1]
+
+        return self._build_prediction(probs, activities, threshold, return_all)
+
+    def _build_prediction(
+        self,
+        probs: np.ndarray,
+        activities: np.ndarray,
+        threshold: float,
+        return_all: bool = False
+    ) -> SpectrumPrediction:
+        """Build a SpectrumPrediction from one row of probabilities/activities."""
+        present_mask = probs >= threshold
+        if return_all:
+            idx = np.arange(len(probs))
+        else:
+            idx = np.nonzero(present_mask)[0]
+
+        sel_present = present_mask[idx]
+        sel_probs = probs[idx]
+        # Absent isotopes report 0 Bq, as before
+        sel_acts = np.where(sel_present, activities[idx], 0.0)
+
+        # Fancy-index the cached name array once instead of a per-isotope
+        # tuple lookup inside the loop
+        sel_names = self._names_arr[idx]
+
+        isotopes = [
+            IsotopePrediction(
+                name=n,
+                probability=p,
+                activity_bq=a,
+                present=m
+            )
+            for n, p, a, m in zip(
+                sel_names.tolist(), sel_probs.tolist(), sel_acts.tolist(), sel_present.tolist()
+            )
+        ]
+
         # Calculate overall confidence (average of top predictions)
-        present_isotopes = [iso for iso in isotopes if iso.present]
-        if present_isotopes:
-            confidence = np.mean([iso.probability for iso in present_isotopes])
+        num_present = int(present_mask.sum())
+        if num_present:
+            confidence = float(probs[present_mask].mean())
         else:
-            confidence = 1.0 - probs.max()  # Confidence in "background only"
-        
+            confidence = 1.0 - float(probs.max())  # Confidence in "background only"
+
         return SpectrumPrediction(
             isotopes=isotopes,
-            num_present=len(present_isotopes),
-            confidence=float(confidence),
-            threshold_used=threshold
+            num_present=num_present,
+            confidence=confidence,
+            threshold_used=threshold,
+            _probs=sel_probs,
+            _activities=sel_acts
         )
-    
+
+    @torch.inference_mode()
     def predict_batch(
         self,
         spectra: List[np.ndarray],
         threshold: float = 0.5
     ) -> List[SpectrumPrediction]:
         """
-        Run inference on multiple spectra.
-        
+        Run inference on multiple spectra in a single forward pass.
+
         Args:
             spectra: List of spectrum arrays
             threshold: Probability threshold
-            
+
         Returns:
             List of predictions
         """
-        return [self.predict(s, threshold) for s in spectra]
+        if not spectra:
+            return []
+
+        batch = self.preprocess_batch(spectra)
+        probs, activities, _ = self._forward(batch, threshold)
+
+        # One D2H transfer for the whole batch
+        probs = probs.cpu().numpy()
+        activities = activities.cpu().numpy() * self._activity_scale
+
+        return [
+            self._build_prediction(probs[i], activities[i], threshold)
+            for i in range(len(spectra))
+        ]
     
     def predict_from_file(
         self,
@@ -281,7 +735,9 @@ class VegaInference:
         Returns:
             SpectrumPrediction
         """
-        spectrum = np.load(file_path)
+        # mmap avoids copying the full array into RAM; only the pages the
+        # mean/normalize steps actually touch get faulted in.
+        spectrum = np.load(file_path, mmap_mode='r')
         return self.predict(spectrum, threshold)
 
 
@@ -309,23 +765,41 @@ def run_inference_demo(
         print(f"Spectra directory not found: {spectra_dir}")
         return
     
-    # Load labels for comparison
+    # Load labels for comparison. labels.json has one entry per sample and
+    # can reach hundreds of MB on big datasets; orjson parses it ~10x
+    # faster than stdlib json when available.
     labels_path = data_path / "labels.json"
-    with open(labels_path, 'r') as f:
-        labels = json.load(f)
+    if orjson is not None:
+        labels = orjson.loads(labels_path.read_bytes())
+    else:
+        with open(labels_path, 'r') as f:
+            labels = json.load(f)
     
     print("\n" + "=" * 70)
     print("VEGA INFERENCE DEMO")
     print("=" * 70)
     
-    # Process each spectrum
-    npy_files = list(spectra_dir.glob("*.npy"))
-    print(f"\nFound {len(npy_files)} spectra to process\n")
-    
-    for npy_file in npy_files:
+    # Process each spectrum. The directory is streamed with os.scandir so
+    # results start flowing immediately instead of waiting for a full glob
+    # of a potentially huge directory; file loading/reduction runs in a
+    # small thread pool so disk I/O overlaps with model inference on the
+    # previous batch, and batches of spectra share a single forward pass.
+    def _iter_npy(directory: Path):
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith('.npy'):
+                    yield Path(entry.path)
+
+    def _load_reduced(npy_file: Path) -> np.ndarray:
+        spectrum = np.load(npy_file, mmap_mode='r')
+        if spectrum.ndim == 2:
+            return np.asarray(spectrum.mean(axis=0), dtype=np.float32)
+        return np.asarray(spectrum, dtype=np.float32)
+
+    def _show_result(npy_file: Path, prediction: SpectrumPrediction) -> None:
         # Extract sample ID from filename
         sample_id = npy_file.stem.replace("spectrum_", "")
-        
+
         # Get ground truth
         if sample_id in labels['samples']:
             ground_truth = labels['samples'][sample_id]
@@ -334,10 +808,7 @@ def run_inference_demo(
         else:
             true_isotopes = []
             true_activities = {}
-        
-        # Run prediction
-        prediction = inference.predict_from_file(npy_file, threshold=threshold)
-        
+
         # Display results
         print("-" * 70)
         print(f"Sample: {sample_id}")
@@ -347,27 +818,61 @@ def run_inference_demo(
                 f"{k}: {v:.1f} Bq" for k, v in true_activities.items()
             )
             print(f"Ground Truth Activities: {activities_str}")
-        
+
         print(f"\nPrediction:")
         print(prediction.summary())
-        
+
         # Compare
         predicted_names = {iso.name for iso in prediction.get_present_isotopes()}
         true_names = set(true_isotopes)
-        
+
         correct = predicted_names & true_names
         missed = true_names - predicted_names
         false_positives = predicted_names - true_names
-        
+
         if correct:
             print(f"\n✓ Correctly identified: {correct}")
         if missed:
             print(f"✗ Missed: {missed}")
         if false_positives:
             print(f"! False positives: {false_positives}")
-        
+
         print()
-    
+
+    batch_size = 32
+    max_inflight = 64  # bounds how many loaded spectra wait for the model
+    num_processed = 0
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        pending_files: List[Path] = []
+        pending_spectra: List[np.ndarray] = []
+
+        def _flush() -> None:
+            if not pending_files:
+                return
+            predictions = inference.predict_batch(pending_spectra, threshold=threshold)
+            for f, prediction in zip(pending_files, predictions):
+                _show_result(f, prediction)
+            pending_files.clear()
+            pending_spectra.clear()
+
+        def _consume(npy_file: Path, future) -> None:
+            nonlocal num_processed
+            pending_files.append(npy_file)
+            pending_spectra.append(future.result())
+            num_processed += 1
+            if len(pending_files) >= batch_size:
+                _flush()
+
+        inflight = deque()
+        for npy_file in _iter_npy(spectra_dir):
+            inflight.append((npy_file, pool.submit(_load_reduced, npy_file)))
+            if len(inflight) >= max_inflight:
+                _consume(*inflight.popleft())
+        while inflight:
+            _consume(*inflight.popleft())
+        _flush()
+
+    print(f"Processed {num_processed} spectra")
     print("=" * 70)
     print("Inference complete!")
     print("=" * 70)
@@ -0,0 +1,57 @@
+"""
+Numba-compiled scalar kernels for spectrum generation hot loops.
+
+The generator calls energy/channel/resolution math thousands of times per
+spectrum; going through dataclass method dispatch plus NumPy scalar ufuncs
+dominates those loops. These are the same formulas as DetectorConfig's
+methods, extracted to pure-arithmetic functions over primitives so numba
+can compile them to machine code. cache=True persists the compiled
+artifacts on disk, avoiding the multi-second cold-start compile on every
+process launch.
+
+numba is optional: without it the functions run as plain Python, which is
+still correct, just slower.
+"""
+
+import math
+
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - exercised only without numba
+    def njit(*args, **kwargs):
+        """No-op stand-in: leaves the function as plain Python."""
+        if args and callable(args[0]):
+            return args[0]
+
+        def wrap(func):
+            return func
+        return wrap
+
+
+@njit(cache=True)
+def energy_to_channel(
+    energy_kev: float,
+    energy_min_kev: float,
+    channel_width_kev: float,
+    skip_first_channel: bool,
+    num_channels: int,
+) -> int:
+    """Convert energy in keV to modeled usable channel index."""
+    raw_channel = int((energy_kev - energy_min_kev) / channel_width_kev)
+    if skip_first_channel:
+        channel = raw_channel - 1
+        max_channel = num_channels - 2
+    else:
+        channel = raw_channel
+        max_channel = num_channels - 1
+    if channel < 0:
+        return 0
+    if channel > max_channel:
+        return max_channel
+    return channel
+
+
+@njit(cache=True)
+def sigma_at_energy(energy_kev: float, fwhm_at_662: float) -> float:
+    """Gaussian sigma (keV) at a given energy; see DetectorConfig."""
+    return fwhm_at_662 * math.sqrt(662.0 * energy_kev) / 2.355
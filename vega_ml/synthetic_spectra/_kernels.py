@@ -0,0 +1,68 @@
+"""
+Numba-compiled array kernels for the spectrogram hot path.
+
+The template fast path builds a (T, channels) rate matrix from a static
+per-second source rate plus per-interval background rows, then draws
+Poisson counts. Fusing the accumulation and the draw into one compiled
+parallel pass avoids materializing the intermediate rate matrix and
+removes the Python/NumPy dispatch between the two steps.
+
+numba is optional: HAS_NUMBA is False without it and callers fall back
+to the vectorized NumPy path.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:  # pragma: no cover - exercised only without numba
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in: leaves the function as plain Python."""
+        if args and callable(args[0]):
+            return args[0]
+
+        def wrap(func):
+            return func
+        return wrap
+
+    prange = range
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def sample_spectrogram_counts(
+    source_rate: np.ndarray,
+    background_rows: np.ndarray,
+    interval_seconds: float,
+    seed: int,
+) -> np.ndarray:
+    """
+    Draw Poisson counts for a whole spectrogram in one fused pass.
+
+    counts[t, c] ~ Poisson(source_rate[c] * interval_seconds
+                           + background_rows[t, c])
+
+    Args:
+        source_rate: Per-second expected source counts, shape (channels,)
+        background_rows: Per-interval expected background counts,
+            shape (T, channels)
+        interval_seconds: Length of each time interval
+        seed: Seed for numba's per-kernel RNG
+
+    Returns:
+        int64 counts array of shape (T, channels)
+    """
+    num_intervals, num_channels = background_rows.shape
+    counts = np.empty((num_intervals, num_channels), dtype=np.int64)
+
+    np.random.seed(seed)
+    for t in prange(num_intervals):
+        for c in range(num_channels):
+            lam = source_rate[c] * interval_seconds + background_rows[t, c]
+            if lam < 0.0:
+                lam = 0.0
+            counts[t, c] = np.random.poisson(lam)
+
+    return counts
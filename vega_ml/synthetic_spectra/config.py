@@ -5,10 +5,17 @@ Contains configuration parameters for Radiacode gamma spectrometers
 and other detector settings.
 """
 
+import functools
 from dataclasses import dataclass, field
-from typing import Dict, Optional
+from typing import Dict, Optional, Union
 import numpy as np
 
+from . import _fast
+
+# sigma = FWHM / (2 * sqrt(2 * ln(2))); precomputed so the hot paths
+# multiply instead of divide.
+_INV_FWHM_TO_SIGMA = 1.0 / 2.355
+
 
 @dataclass
 class DetectorConfig:
@@ -39,56 +46,80 @@ class DetectorConfig:
     # Detector volume in cm³
     detector_volume_cm3: float = 1.0
     
-    def get_channel_width_kev(self) -> float:
-        """Get the width of each channel in keV."""
+    # Derived values are pure functions of the (effectively immutable) fields
+    # above, so they are computed once and cached. Generation hot loops call
+    # these thousands of times per run.
+    @functools.cached_property
+    def channel_width_kev(self) -> float:
+        """Width of each channel in keV."""
         return (self.energy_max_kev - self.energy_min_kev) / self.num_channels
-    
-    def get_energy_bins(self) -> np.ndarray:
-        """Get array of energy bin centers (keV) for the modeled usable channels."""
-        channel_width = self.get_channel_width_kev()
 
+    @functools.cached_property
+    def energy_bins(self) -> np.ndarray:
+        """Energy bin centers (keV) for the modeled usable channels."""
         # Raw device channels are assumed to be 0..num_channels-1 with centers:
         #   E_center(k) = E_min + (k + 0.5) * channel_width
         # If we skip the first raw channel (k=0), we model usable channels k=1..num_channels-1.
         start_raw_channel = 1 if self.skip_first_channel else 0
         raw_channels = np.arange(start_raw_channel, self.num_channels, dtype=np.float64)
-        return self.energy_min_kev + (raw_channels + 0.5) * channel_width
-    
-    def get_fwhm_at_energy(self, energy_kev: float) -> float:
+        return self.energy_min_kev + (raw_channels + 0.5) * self.channel_width_kev
+
+    def get_channel_width_kev(self) -> float:
+        """Get the width of each channel in keV."""
+        return self.channel_width_kev
+
+    def get_energy_bins(self) -> np.ndarray:
+        """Get array of energy bin centers (keV) for the modeled usable channels."""
+        return self.energy_bins
+
+    def get_fwhm_at_energy(
+        self, energy_kev: Union[float, np.ndarray]
+    ) -> Union[float, np.ndarray]:
         """
-        Calculate FWHM at a given energy.
-        
+        Calculate FWHM at a given energy (scalar or array of energies in keV).
+
         For scintillators, FWHM scales approximately as sqrt(E).
-        FWHM(E) = FWHM_662 * sqrt(662/E) * E / 662 = FWHM_662 * sqrt(E/662)
+        FWHM(E) = FWHM_662 * sqrt(662/E) * E = FWHM_662 * sqrt(662 * E)
         """
-        return self.fwhm_at_662 * np.sqrt(662.0 / energy_kev) * energy_kev
-    
-    def get_sigma_at_energy(self, energy_kev: float) -> float:
+        return self.fwhm_at_662 * np.sqrt(662.0 * np.asarray(energy_kev))
+
+    def get_sigma_at_energy(
+        self, energy_kev: Union[float, np.ndarray]
+    ) -> Union[float, np.ndarray]:
         """
-        Get Gaussian sigma at a given energy.
+        Get Gaussian sigma at a given energy (scalar or array of energies in keV).
         sigma = FWHM / (2 * sqrt(2 * ln(2))) ≈ FWHM / 2.355
         """
-        fwhm = self.get_fwhm_at_energy(energy_kev)
-        return fwhm / 2.355
+        return self.get_fwhm_at_energy(energy_kev) * _INV_FWHM_TO_SIGMA
     
     def energy_to_channel(self, energy_kev: float) -> int:
         """Convert energy in keV to modeled usable channel index."""
-        channel_width = self.get_channel_width_kev()
-        raw_channel = int((energy_kev - self.energy_min_kev) / channel_width)
+        # Delegates to the numba-compiled kernel; tight generator loops can
+        # import _fast.energy_to_channel directly and skip method dispatch.
+        return _fast.energy_to_channel(
+            energy_kev,
+            self.energy_min_kev,
+            self.channel_width_kev,
+            self.skip_first_channel,
+            self.num_channels,
+        )
+
+    def energy_to_channel_array(self, energies_kev: np.ndarray) -> np.ndarray:
+        """Vectorized energy_to_channel for an array of energies (keV)."""
+        raw_channels = ((np.asarray(energies_kev) - self.energy_min_kev) / self.channel_width_kev).astype(np.int64)
         if self.skip_first_channel:
-            channel = raw_channel - 1
+            channels = raw_channels - 1
             max_channel = self.num_channels - 2
         else:
-            channel = raw_channel
+            channels = raw_channels
             max_channel = self.num_channels - 1
-        return max(0, min(max_channel, channel))
+        return np.clip(channels, 0, max_channel)
 
     def channel_to_energy(self, channel: int) -> float:
         """Convert modeled usable channel index to energy bin center (keV)."""
-        channel_width = self.get_channel_width_kev()
         raw_channel = channel + (1 if self.skip_first_channel else 0)
         raw_channel = max(0, min(self.num_channels - 1, int(raw_channel)))
-        return self.energy_min_kev + (raw_channel + 0.5) * channel_width
+        return self.energy_min_kev + (raw_channel + 0.5) * self.channel_width_kev
 
 
 # Pre-defined configurations for Radiacode devices
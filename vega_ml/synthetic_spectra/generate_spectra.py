@@ -150,16 +150,18 @@ def generate_training_batch(
         dual_isotope_fraction: Fraction of two-isotope samples
         multi_isotope_fraction: Fraction of 3+ isotope samples
         background_only_fraction: Fraction of background-only samples
-        save_png: Whether to also save PNG images
+        save_png: Whether to also render PNG images (done as an
+            offline post-pass, not in the generation loop)
         random_seed: Random seed for reproducibility
     
     Returns:
         List of generated spectra
     """
     
-    if random_seed is not None:
-        np.random.seed(random_seed)
-    
+    # One PCG64 Generator for the whole batch: cheaper draws than the
+    # legacy global RNG and no global state
+    rng = np.random.default_rng(random_seed)
+
     # Create output directories
     output_dir = Path(output_dir)
     spectra_dir = output_dir / "spectra"
@@ -196,42 +198,51 @@ def generate_training_batch(
     
     sample_num = 0
     
-    # Generate single isotope samples
+    # Generate single isotope samples. All configs go through
+    # generate_batch so each isotope's peak template is built once and
+    # reused across every sample that draws it, with one Poisson call per
+    # spectrogram instead of one per time interval.
     print("Generating single-isotope samples...")
+    single_configs = []
     for i in range(n_single):
-        isotope = np.random.choice(isotope_pool)
-        activity = np.random.uniform(*activity_range)
-        duration = np.random.uniform(*duration_range)
-        
-        spectrum = generate_single_isotope_sample(
-            generator,
-            isotope,
-            activity,
-            duration,
+        isotope = rng.choice(isotope_pool)
+        activity = rng.uniform(*activity_range)
+        duration = rng.uniform(*duration_range)
+
+        single_configs.append(SpectrumConfig(
+            duration_seconds=duration,
+            sources=[
+                IsotopeSource(
+                    isotope_name=isotope,
+                    activity_bq=activity,
+                    include_daughters=True
+                )
+            ],
             detector_name=detector_name,
             include_background=True,
-        )
-        
+        ))
+
+    for spectrum in generator.generate_batch(single_configs):
         # Save spectrum
         save_spectrum(
             spectrum,
             spectra_dir,
             save_image=True,
-            image_format='both' if save_png else 'npy'
+            image_format='npy'
         )
-        
+
         generated_spectra.append(spectrum)
         sample_num += 1
-        
+
         if sample_num % 10 == 0:
             print(f"  Generated {sample_num}/{num_samples} samples...")
     
     # Generate dual isotope samples
     print("Generating dual-isotope samples...")
     for i in range(n_dual):
-        isotopes = np.random.choice(isotope_pool, size=2, replace=False)
-        activities = [np.random.uniform(*activity_range) for _ in range(2)]
-        duration = np.random.uniform(*duration_range)
+        isotopes = rng.choice(isotope_pool, size=2, replace=False)
+        activities = list(rng.uniform(*activity_range, size=2))
+        duration = rng.uniform(*duration_range)
         
         spectrum = generate_mixed_isotope_sample(
             generator,
@@ -246,7 +257,7 @@ def generate_training_batch(
             spectrum,
             spectra_dir,
             save_image=True,
-            image_format='both' if save_png else 'npy'
+            image_format='npy'
         )
         
         generated_spectra.append(spectrum)
@@ -258,10 +269,10 @@ def generate_training_batch(
     # Generate multi-isotope samples
     print("Generating multi-isotope samples...")
     for i in range(n_multi):
-        num_isotopes = np.random.randint(3, min(6, len(isotope_pool)))
-        isotopes = np.random.choice(isotope_pool, size=num_isotopes, replace=False)
-        activities = [np.random.uniform(*activity_range) for _ in range(num_isotopes)]
-        duration = np.random.uniform(*duration_range)
+        num_isotopes = int(rng.integers(3, min(6, len(isotope_pool))))
+        isotopes = rng.choice(isotope_pool, size=num_isotopes, replace=False)
+        activities = list(rng.uniform(*activity_range, size=num_isotopes))
+        duration = rng.uniform(*duration_range)
         
         spectrum = generate_mixed_isotope_sample(
             generator,
@@ -276,7 +287,7 @@ def generate_training_batch(
             spectrum,
             spectra_dir,
             save_image=True,
-            image_format='both' if save_png else 'npy'
+            image_format='npy'
         )
         
         generated_spectra.append(spectrum)
@@ -288,7 +299,7 @@ def generate_training_batch(
     # Generate background-only samples
     print("Generating background-only samples...")
     for i in range(n_background):
-        duration = np.random.uniform(*duration_range)
+        duration = rng.uniform(*duration_range)
         
         config = SpectrumConfig(
             duration_seconds=duration,
@@ -303,7 +314,7 @@ def generate_training_batch(
             spectrum,
             spectra_dir,
             save_image=True,
-            image_format='both' if save_png else 'npy'
+            image_format='npy'
         )
         
         generated_spectra.append(spectrum)
@@ -314,6 +325,13 @@ def generate_training_batch(
     # Individual JSON labels are saved per-sample by save_spectrum()
     # No combined labels.json needed for efficient large-scale training
     
+    if save_png:
+        # Render images offline so the generation loop never touches
+        # matplotlib/PIL
+        from synthetic_spectra.render_pngs import iter_npy_samples, render_pngs
+        rendered = render_pngs(iter_npy_samples(spectra_dir), spectra_dir)
+        print(f"Rendered {rendered} PNG images")
+    
     return generated_spectra
 
 
@@ -2,7 +2,8 @@
 Synthetic Spectra Generation Script v2
 
 Improvements over v1:
-- Parallel generation using multiprocessing for 10x+ speedup
+- Parallel generation using a thread pool for 10x+ speedup (the hot
+  NumPy work releases the GIL, so threads avoid fork and pickling cost)
 - Class-balanced isotope sampling to ensure all isotopes are represented
 - More variable background noise (intensity, composition)
 - Memory efficient - doesn't accumulate spectra in memory
@@ -18,11 +19,16 @@ from pathlib import Path
 import json
 from datetime import datetime
 import numpy as np
-from multiprocessing import Pool, cpu_count
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from multiprocessing import cpu_count
 from functools import partial
 import time
 from typing import List, Tuple, Dict, Optional
 import os
+import hashlib
+import pickle
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -32,9 +38,11 @@ from synthetic_spectra.generator import (
     SpectrumConfig,
     IsotopeSource,
     GeneratedSpectrum,
-    save_spectrum,
+    fast_save,
+    populate_template_cache,
 )
 from synthetic_spectra.config import RADIACODE_CONFIGS
+from synthetic_spectra import ground_truth
 from synthetic_spectra.ground_truth import get_isotope
 
 
@@ -90,6 +98,68 @@ def get_valid_isotope_pool() -> Tuple[List[str], Dict[str, List[str]]]:
     return all_isotopes, valid_categories
 
 
+def get_valid_isotope_pool_cached() -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    get_valid_isotope_pool with an on-disk cache.
+
+    Validating the pool walks the whole isotope database on every run;
+    the result only changes when the ground-truth data does, so it is
+    pickled under ~/.cache/vega_ml keyed by a hash of the isotope data
+    source. A stale or unreadable cache falls back to recomputing.
+    """
+    source = Path(ground_truth.isotope_data.__file__).read_bytes()
+    key = hashlib.md5(source).hexdigest()
+    cache_path = (Path.home() / ".cache" / "vega_ml"
+                  / f"isotope_pool_{key}.pkl")
+
+    if cache_path.exists():
+        try:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            pass  # Corrupt cache - recompute below
+
+    pool = get_valid_isotope_pool()
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, 'wb') as f:
+            pickle.dump(pool, f)
+    except OSError:
+        pass  # Cache directory not writable - still return the pool
+    return pool
+
+
+def build_category_weights(
+    isotope_pool: List[str],
+    category_pools: Dict[str, List[str]]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Precompute the isotope array and draw weights for category-balanced
+    sampling.
+
+    The weight of each isotope equals the probability of drawing it by
+    first picking a category uniformly and then an isotope uniformly
+    within it, so a single weighted rng.choice(..., replace=False)
+    reproduces that distribution without per-draw retry loops.
+
+    Returns:
+        Tuple of (isotope_array, normalized_weights)
+    """
+    isotope_arr = np.array(isotope_pool)
+    weights = np.zeros(len(isotope_pool))
+    index = {name: i for i, name in enumerate(isotope_pool)}
+
+    non_empty = [pool for pool in category_pools.values() if pool]
+    for pool in non_empty:
+        for name in pool:
+            weights[index[name]] += 1.0 / (len(non_empty) * len(pool))
+
+    if weights.sum() <= 0:
+        weights[:] = 1.0
+    weights /= weights.sum()
+    return isotope_arr, weights
+
+
 # =============================================================================
 # BACKGROUND VARIATION
 # =============================================================================
@@ -113,11 +183,14 @@ class BackgroundConfig:
     
     def sample(self, rng: np.random.Generator) -> dict:
         """Sample a random background configuration."""
+        # One vectorized draw instead of four Generator dispatches
+        v = rng.random(4)
         return {
-            'background_cps': rng.uniform(self.intensity_min, self.intensity_max) * 5.0,
-            'include_k40': rng.random() < self.k40_prob,
-            'include_radon': rng.random() < self.radon_prob,
-            'include_thorium': rng.random() < self.thorium_prob,
+            'background_cps': (self.intensity_min
+                               + v[0] * (self.intensity_max - self.intensity_min)) * 5.0,
+            'include_k40': v[1] < self.k40_prob,
+            'include_radon': v[2] < self.radon_prob,
+            'include_thorium': v[3] < self.thorium_prob,
         }
 
 
@@ -125,34 +198,146 @@ class BackgroundConfig:
 # SINGLE SAMPLE GENERATION (for parallel workers)
 # =============================================================================
 
+# One lazily built SpectrumGenerator per worker thread: generator init
+# (energy bins, template cache) happens once per thread, not per sample
+_tls = threading.local()
+
+# Shared batch config, installed once per run before tasks are
+# submitted; tasks then carry only (sample_idx, seed_seq)
+_BATCH_CONFIG: dict = {}
+
+
+def _writer_loop(write_queue: "queue.Queue") -> None:
+    """
+    Dedicated array-writer loop, run on its own thread.
+
+    Compute workers hand off (path, array) pairs instead of blocking on
+    the disk themselves, so write latency (notably on network mounts)
+    overlaps with simulation instead of stalling it. A None item is the
+    shutdown sentinel.
+    """
+    while True:
+        item = write_queue.get()
+        if item is None:
+            break
+        path, arr = item
+        try:
+            fast_save(path, arr)
+        except Exception as e:
+            print(f"Error writing {path}: {e}")
+
+
+def _get_thread_label_file(output_dir: str):
+    """
+    This thread's append-only labels file, opened once.
+
+    One JSONL line per sample replaces a .json sidecar per sample, which
+    was syscall-dominated (open/write/close for a few hundred bytes).
+    """
+    fh = getattr(_tls, 'label_file', None)
+    if fh is None or getattr(_tls, 'label_dir', None) != output_dir:
+        labels_dir = Path(output_dir) / "labels"
+        labels_dir.mkdir(parents=True, exist_ok=True)
+        fh = open(labels_dir / f"labels_{threading.get_ident()}.jsonl", 'a')
+        _tls.label_file = fh
+        _tls.label_dir = output_dir
+    return fh
+
+
+def _get_thread_generator(detector_name: str) -> SpectrumGenerator:
+    generator = getattr(_tls, 'generator', None)
+    if generator is None or getattr(_tls, 'detector_name', None) != detector_name:
+        generator = SpectrumGenerator(
+            detector_config=RADIACODE_CONFIGS.get(detector_name)
+        )
+        _tls.generator = generator
+        _tls.detector_name = detector_name
+    return generator
+
+
+# Sample-type ids; SAMPLE_TYPE_BUILDERS is indexed by these
+TYPE_SINGLE, TYPE_DUAL, TYPE_MULTI, TYPE_BACKGROUND = 0, 1, 2, 3
+
+
+def _sources_single(rng, sample_idx: int, config: dict) -> List[IsotopeSource]:
+    # For class balance, cycle through isotopes
+    isotope_pool = config['isotope_pool']
+    isotope = isotope_pool[sample_idx % len(isotope_pool)]
+    return [IsotopeSource(
+        isotope_name=isotope,
+        activity_bq=rng.uniform(*config['activity_range']),
+        include_daughters=True
+    )]
+
+
+def _sources_dual(rng, sample_idx: int, config: dict) -> List[IsotopeSource]:
+    # One category-weighted draw without replacement replaces the
+    # draw-then-retry-on-collision loop
+    pair = rng.choice(config['isotope_arr'], size=2, replace=False,
+                      p=config['isotope_weights'])
+    return [
+        IsotopeSource(
+            isotope_name=iso,
+            activity_bq=rng.uniform(*config['activity_range']),
+            include_daughters=True
+        )
+        for iso in pair
+    ]
+
+
+def _sources_multi(rng, sample_idx: int, config: dict) -> List[IsotopeSource]:
+    # 3-5 distinct isotopes in one category-weighted draw, no
+    # duplicate-rejection loop
+    num_isotopes = int(rng.integers(3, 6))
+    selected = rng.choice(config['isotope_arr'], size=num_isotopes,
+                          replace=False, p=config['isotope_weights'])
+    return [
+        IsotopeSource(
+            isotope_name=iso,
+            activity_bq=rng.uniform(*config['activity_range']),
+            include_daughters=True
+        )
+        for iso in selected
+    ]
+
+
+def _sources_background(rng, sample_idx: int, config: dict) -> List[IsotopeSource]:
+    return []
+
+
+SAMPLE_TYPE_BUILDERS = (
+    _sources_single, _sources_dual, _sources_multi, _sources_background
+)
+
+
 def generate_single_sample(
-    args: Tuple[int, dict]
+    args: Tuple[int, np.random.SeedSequence]
 ) -> Optional[str]:
     """
-    Generate a single sample. Designed to be called by worker processes.
+    Generate a single sample. Designed to be called by worker threads.
     
     Args:
-        args: Tuple of (sample_index, config_dict)
+        args: Tuple of (sample_index, seed_sequence); the run
+            configuration comes from the module-level _BATCH_CONFIG
     
     Returns:
         Sample ID if successful, None if failed
     """
-    sample_idx, config = args
+    sample_idx, seed_seq = args
+    config = _BATCH_CONFIG
     
     try:
-        # Create RNG with unique seed per sample
-        rng = np.random.default_rng(config['base_seed'] + sample_idx)
-        
-        # Initialize generator (each worker creates its own)
-        detector_config = RADIACODE_CONFIGS.get(config['detector_name'])
-        generator = SpectrumGenerator(detector_config=detector_config)
+        # Each sample gets its own spawned SeedSequence: statistically
+        # independent PCG64 streams, unlike base_seed + idx arithmetic
+        rng = np.random.default_rng(seed_seq)
+        # The physics layer still draws from the legacy global RNG; seed
+        # it from the same sequence so single-threaded runs stay
+        # reproducible (thread interleaving makes those draws
+        # nondeterministic under parallel generation)
+        np.random.seed(seed_seq.generate_state(1)[0])
         
-        # Determine sample type based on distribution
-        sample_type = config['sample_types'][sample_idx % len(config['sample_types'])]
-        
-        # Get isotopes for this sample
-        isotope_pool = config['isotope_pool']
-        category_pools = config['category_pools']
+        # Reuse this thread's generator instead of rebuilding per sample
+        generator = _get_thread_generator(config['detector_name'])
         
         # Sample background configuration
         bg_config = BackgroundConfig(
@@ -164,65 +349,10 @@ def generate_single_sample(
         # Random duration
         duration = rng.uniform(*config['duration_range'])
         
-        # Build sources based on sample type
-        sources = []
-        
-        if sample_type == 'single':
-            # For class balance, cycle through isotopes
-            isotope_idx = sample_idx % len(isotope_pool)
-            isotope = isotope_pool[isotope_idx]
-            activity = rng.uniform(*config['activity_range'])
-            sources.append(IsotopeSource(
-                isotope_name=isotope,
-                activity_bq=activity,
-                include_daughters=True
-            ))
-            
-        elif sample_type == 'dual':
-            # Pick from different categories for variety
-            categories = list(category_pools.keys())
-            cat1, cat2 = rng.choice(categories, size=2, replace=True)
-            iso1 = rng.choice(category_pools[cat1]) if category_pools[cat1] else rng.choice(isotope_pool)
-            iso2 = rng.choice(category_pools[cat2]) if category_pools[cat2] else rng.choice(isotope_pool)
-            
-            # Ensure different isotopes
-            while iso2 == iso1:
-                iso2 = rng.choice(isotope_pool)
-            
-            for iso in [iso1, iso2]:
-                activity = rng.uniform(*config['activity_range'])
-                sources.append(IsotopeSource(
-                    isotope_name=iso,
-                    activity_bq=activity,
-                    include_daughters=True
-                ))
-                
-        elif sample_type == 'multi':
-            # 3-5 isotopes from various categories
-            num_isotopes = rng.integers(3, 6)
-            selected = set()
-            
-            for _ in range(num_isotopes):
-                cat = rng.choice(list(category_pools.keys()))
-                pool = category_pools[cat] if category_pools[cat] else isotope_pool
-                iso = rng.choice(pool)
-                
-                # Avoid duplicates
-                attempts = 0
-                while iso in selected and attempts < 10:
-                    iso = rng.choice(isotope_pool)
-                    attempts += 1
-                
-                if iso not in selected:
-                    selected.add(iso)
-                    activity = rng.uniform(*config['activity_range'])
-                    sources.append(IsotopeSource(
-                        isotope_name=iso,
-                        activity_bq=activity,
-                        include_daughters=True
-                    ))
-        
-        # elif sample_type == 'background': sources stays empty
+        # Dispatch on the precomputed type-id array - no string compares
+        # or elif chain per sample
+        type_id = config['sample_types'][sample_idx]
+        sources = SAMPLE_TYPE_BUILDERS[type_id](rng, sample_idx, config)
         
         # Create spectrum config
         spec_config = SpectrumConfig(
@@ -239,15 +369,21 @@ def generate_single_sample(
         # Generate spectrum
         spectrum = generator.generate_spectrum(spec_config)
         
-        # Save spectrum
-        output_dir = Path(config['output_dir']) / "spectra"
-        save_spectrum(
-            spectrum,
-            output_dir,
-            save_image=True,
-            image_format='npy'  # Skip PNG for speed
+        # Hand the array to the writer thread; labels go to this
+        # thread's JSONL log instead of a per-sample .json sidecar.
+        # spectra_dir is the one Path built in the parent - no per-sample
+        # Path construction here
+        config['write_queue'].put(
+            (config['spectra_dir'] / f"spectrum_{spectrum.sample_id}.npy",
+             spectrum.data)
         )
         
+        label_file = _get_thread_label_file(config['output_dir'])
+        label_file.write(json.dumps(
+            {'sample_id': spectrum.sample_id, **spectrum.labels}
+        ) + "\n")
+        label_file.flush()
+        
         return spectrum.sample_id
         
     except Exception as e:
@@ -272,7 +408,6 @@ def generate_training_batch_parallel(
     bg_intensity_range: Tuple[float, float] = (0.3, 3.0),
     num_workers: int = None,
     random_seed: int = None,
-    chunk_size: int = 100,
 ) -> int:
     """
     Generate training samples in parallel.
@@ -290,7 +425,6 @@ def generate_training_batch_parallel(
         bg_intensity_range: (min, max) background intensity multiplier
         num_workers: Number of parallel workers (default: CPU count - 1)
         random_seed: Base random seed
-        chunk_size: Number of samples per worker batch
     
     Returns:
         Number of successfully generated samples
@@ -306,8 +440,11 @@ def generate_training_batch_parallel(
     spectra_dir = output_dir / "spectra"
     spectra_dir.mkdir(parents=True, exist_ok=True)
     
-    # Get isotope pools
-    isotope_pool, category_pools = get_valid_isotope_pool()
+    # Get isotope pools (cached on disk across runs)
+    isotope_pool, category_pools = get_valid_isotope_pool_cached()
+    isotope_arr, isotope_weights = build_category_weights(
+        isotope_pool, category_pools
+    )
     
     print(f"Isotope pool: {len(isotope_pool)} isotopes across {len(category_pools)} categories")
     
@@ -321,15 +458,18 @@ def generate_training_batch_parallel(
     remaining = num_samples - (n_single + n_dual + n_multi + n_background)
     n_single += remaining
     
-    # Create sample type list (shuffled for variety in batches)
-    sample_types = (
-        ['single'] * n_single +
-        ['dual'] * n_dual +
-        ['multi'] * n_multi +
-        ['background'] * n_background
-    )
-    np.random.seed(random_seed)
-    np.random.shuffle(sample_types)
+    # Shuffled type-id array, one uint8 per sample: ~1 byte/entry versus
+    # ~60 bytes for a Python string per element, and workers index it
+    # directly with no per-element object boxing
+    sample_types = np.concatenate([
+        np.full(n_single, TYPE_SINGLE, dtype=np.uint8),
+        np.full(n_dual, TYPE_DUAL, dtype=np.uint8),
+        np.full(n_multi, TYPE_MULTI, dtype=np.uint8),
+        np.full(n_background, TYPE_BACKGROUND, dtype=np.uint8),
+    ])
+    ss = np.random.SeedSequence(random_seed)
+    child_seeds = ss.spawn(num_samples)
+    np.random.default_rng(ss).shuffle(sample_types)
     
     print(f"\nGenerating {num_samples} samples with {num_workers} workers:")
     print(f"  - Single isotope: {n_single} ({single_isotope_fraction*100:.0f}%)")
@@ -339,49 +479,103 @@ def generate_training_batch_parallel(
     print(f"  - Background intensity: {bg_intensity_range[0]:.1f}x - {bg_intensity_range[1]:.1f}x")
     print()
     
-    # Shared config for all workers
+    # Shared config for all workers. Worker threads see this one dict by
+    # reference - unlike a process pool, nothing here (the pools, the
+    # full sample_types array) is ever pickled per task, so there is no
+    # need for a SharedMemory copy of these read-only structures
     shared_config = {
         'detector_name': detector_name,
         'output_dir': str(output_dir),
+        'spectra_dir': spectra_dir,
         'duration_range': duration_range,
         'activity_range': activity_range,
         'bg_intensity_min': bg_intensity_range[0],
         'bg_intensity_max': bg_intensity_range[1],
-        'base_seed': random_seed,
         'isotope_pool': isotope_pool,
         'category_pools': category_pools,
+        'isotope_arr': isotope_arr,
+        'isotope_weights': isotope_weights,
         'sample_types': sample_types,
     }
     
+    # Build every isotope template once up front; the module-level cache
+    # is shared by all worker threads
+    num_templates = populate_template_cache(
+        isotope_pool, RADIACODE_CONFIGS.get(detector_name)
+    )
+    print(f"Pre-built {num_templates} isotope templates")
+    
     # Generate samples in parallel
     start_time = time.time()
     successful = 0
     
-    # Create argument list
-    args_list = [(i, shared_config) for i in range(num_samples)]
-    
-    # Use multiprocessing pool
-    with Pool(processes=num_workers) as pool:
-        # Process in chunks and report progress
-        for i in range(0, num_samples, chunk_size):
-            chunk_end = min(i + chunk_size, num_samples)
-            chunk_args = args_list[i:chunk_end]
-            
-            results = pool.map(generate_single_sample, chunk_args)
-            
-            chunk_success = sum(1 for r in results if r is not None)
-            successful += chunk_success
-            
-            # Progress report
-            elapsed = time.time() - start_time
-            rate = successful / elapsed if elapsed > 0 else 0
-            eta = (num_samples - successful) / rate if rate > 0 else 0
-            
-            print(f"  Progress: {successful}/{num_samples} ({100*successful/num_samples:.1f}%) | "
-                  f"Rate: {rate:.1f} samples/s | ETA: {eta/60:.1f} min")
+    # Bounded queue so compute threads throttle if the disk falls
+    # behind instead of piling arrays up in memory
+    write_queue = queue.Queue(maxsize=num_workers * 4)
+    shared_config['write_queue'] = write_queue
+    writer = threading.Thread(target=_writer_loop, args=(write_queue,))
+    writer.start()
+
+    # Install the run configuration once; tasks carry only their index
+    # and seed
+    _BATCH_CONFIG.clear()
+    _BATCH_CONFIG.update(shared_config)
+
+    # Longest-processing-time dispatch: multi-isotope samples cost
+    # several times what background-only ones do, so submitting the
+    # expensive types first keeps them from landing on a nearly drained
+    # pool at the end of the run and stretching the tail. Only the
+    # submission order changes; which index gets which type (and seed)
+    # stays exactly as shuffled
+    type_costs = np.array([2, 3, 5, 1], dtype=np.uint8)  # by type id
+    dispatch_order = np.argsort(-type_costs[sample_types].astype(np.int8),
+                                kind='stable')
+    args_list = [(int(i), child_seeds[i]) for i in dispatch_order]
+    
+    # Threads instead of processes: the Poisson/Gaussian hot loops are
+    # NumPy ufuncs that release the GIL, so a thread pool parallelizes
+    # without fork cost, per-worker imports, or result pickling, and all
+    # threads share one isotope template cache
+    #
+    # Results stream back as they finish instead of in fixed chunks, so
+    # one slow multi-isotope sample never stalls the whole pool behind a
+    # chunk barrier
+    completed = 0
+    report_every = max(1, num_samples // 100)
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = [
+            executor.submit(generate_single_sample, args)
+            for args in args_list
+        ]
+        for future in as_completed(futures):
+            if future.result() is not None:
+                successful += 1
+            completed += 1
+
+            if completed % report_every == 0 or completed == num_samples:
+                elapsed = time.time() - start_time
+                rate = successful / elapsed if elapsed > 0 else 0
+                eta = (num_samples - completed) / rate if rate > 0 else 0
+
+                print(f"  Progress: {completed}/{num_samples} ({100*completed/num_samples:.1f}%) | "
+                      f"Rate: {rate:.1f} samples/s | ETA: {eta/60:.1f} min")
     
+    # Drain and stop the writer before declaring the run finished
+    write_queue.put(None)
+    writer.join()
+
     total_time = time.time() - start_time
     
+    # Merge the per-thread label logs into one labels.jsonl
+    labels_dir = output_dir / "labels"
+    merged_path = output_dir / "labels.jsonl"
+    if labels_dir.exists():
+        with open(merged_path, 'w') as merged:
+            for part in sorted(labels_dir.glob("labels_*.jsonl")):
+                with open(part) as f:
+                    merged.write(f.read())
+        print(f"\nLabels merged to {merged_path}")
+    
     print(f"\n{'='*60}")
     print(f"Generation complete!")
     print(f"  Total samples: {successful}/{num_samples}")
@@ -475,13 +669,6 @@ def main():
         help="Random seed for reproducibility"
     )
     
-    parser.add_argument(
-        "--chunk_size",
-        type=int,
-        default=100,
-        help="Samples per progress update (default: 100)"
-    )
-    
     # Sample type fractions
     parser.add_argument("--single_frac", type=float, default=0.40)
     parser.add_argument("--dual_frac", type=float, default=0.30)
@@ -518,7 +705,6 @@ def main():
         bg_intensity_range=(args.bg_min, args.bg_max),
         num_workers=args.workers,
         random_seed=args.seed,
-        chunk_size=args.chunk_size,
     )
 
 
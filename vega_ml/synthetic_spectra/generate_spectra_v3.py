@@ -17,7 +17,9 @@ from pathlib import Path
 import json
 from datetime import datetime
 import numpy as np
-from multiprocessing import Pool, cpu_count
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import cpu_count, get_context
 from functools import partial
 import time
 from typing import List, Tuple, Dict, Optional
@@ -33,6 +35,7 @@ from synthetic_spectra.generator import (
     GeneratedSpectrum,
     save_spectrum,
 )
+from synthetic_spectra.shards import get_worker_memmap_writer, write_manifest
 from synthetic_spectra.config import RADIACODE_CONFIGS
 from synthetic_spectra.ground_truth import get_isotope
 
@@ -83,20 +86,29 @@ def get_valid_isotopes(isotope_list: List[str]) -> List[str]:
     return valid
 
 
-# Pre-validate all pools
-VALID_CALIBRATION = get_valid_isotopes(CALIBRATION_ISOTOPES)
-VALID_MEDICAL = get_valid_isotopes(MEDICAL_ISOTOPES)
-VALID_INDUSTRIAL = get_valid_isotopes(INDUSTRIAL_ISOTOPES)
-VALID_U238_CHAIN = get_valid_isotopes(URANIUM_238_CHAIN)
-VALID_TH232_CHAIN = get_valid_isotopes(THORIUM_232_CHAIN)
-VALID_FALLOUT = get_valid_isotopes(CHERNOBYL_FUKUSHIMA + FRESH_FALLOUT)
-VALID_NORM = get_valid_isotopes(NORM_MATERIALS)
+# Pre-validate all pools, stored as arrays once - rng.choice on a
+# Python list re-runs np.asarray on every call
+_valid_calibration = get_valid_isotopes(CALIBRATION_ISOTOPES)
+_valid_medical = get_valid_isotopes(MEDICAL_ISOTOPES)
+_valid_industrial = get_valid_isotopes(INDUSTRIAL_ISOTOPES)
+_valid_u238 = get_valid_isotopes(URANIUM_238_CHAIN)
+_valid_th232 = get_valid_isotopes(THORIUM_232_CHAIN)
+_valid_fallout = get_valid_isotopes(CHERNOBYL_FUKUSHIMA + FRESH_FALLOUT)
+_valid_norm = get_valid_isotopes(NORM_MATERIALS)
 
-# All valid isotopes for random selection
-ALL_VALID_ISOTOPES = list(set(
-    VALID_CALIBRATION + VALID_MEDICAL + VALID_INDUSTRIAL +
-    VALID_U238_CHAIN + VALID_TH232_CHAIN + VALID_FALLOUT + VALID_NORM
-))
+VALID_CALIBRATION = np.array(_valid_calibration)
+VALID_MEDICAL = np.array(_valid_medical)
+VALID_INDUSTRIAL = np.array(_valid_industrial)
+VALID_U238_CHAIN = np.array(_valid_u238)
+VALID_TH232_CHAIN = np.array(_valid_th232)
+VALID_FALLOUT = np.array(_valid_fallout)
+VALID_NORM = np.array(_valid_norm)
+
+# All valid isotopes for random selection (sorted for determinism)
+ALL_VALID_ISOTOPES = np.array(sorted(set(
+    _valid_calibration + _valid_medical + _valid_industrial +
+    _valid_u238 + _valid_th232 + _valid_fallout + _valid_norm
+)))
 
 
 # =============================================================================
@@ -132,7 +144,9 @@ class SingleCalibrationScenario(SampleScenario):
         super().__init__("single_calibration", fraction)
     
     def generate_sources(self, rng, activity_range) -> List[IsotopeSource]:
-        isotope = rng.choice(VALID_CALIBRATION)
+        # Index with one integer draw; Generator.choice builds an array
+        # wrapper around the pool on every call
+        isotope = VALID_CALIBRATION[rng.integers(VALID_CALIBRATION.size)]
         activity = rng.uniform(*activity_range)
         return [IsotopeSource(isotope, activity, include_daughters=True)]
 
@@ -144,9 +158,9 @@ class SingleMedicalScenario(SampleScenario):
         super().__init__("single_medical", fraction)
     
     def generate_sources(self, rng, activity_range) -> List[IsotopeSource]:
-        if not VALID_MEDICAL:
+        if not VALID_MEDICAL.size:
             return []
-        isotope = rng.choice(VALID_MEDICAL)
+        isotope = VALID_MEDICAL[rng.integers(VALID_MEDICAL.size)]
         activity = rng.uniform(*activity_range)
         return [IsotopeSource(isotope, activity, include_daughters=True)]
 
@@ -158,9 +172,9 @@ class SingleIndustrialScenario(SampleScenario):
         super().__init__("single_industrial", fraction)
     
     def generate_sources(self, rng, activity_range) -> List[IsotopeSource]:
-        if not VALID_INDUSTRIAL:
+        if not VALID_INDUSTRIAL.size:
             return []
-        isotope = rng.choice(VALID_INDUSTRIAL)
+        isotope = VALID_INDUSTRIAL[rng.integers(VALID_INDUSTRIAL.size)]
         activity = rng.uniform(*activity_range)
         return [IsotopeSource(isotope, activity, include_daughters=True)]
 
@@ -172,14 +186,15 @@ class UraniumChainScenario(SampleScenario):
         super().__init__("uranium_chain", fraction)
     
     def generate_sources(self, rng, activity_range) -> List[IsotopeSource]:
-        # All daughters at ~same activity (secular equilibrium)
+        # All daughters at ~same activity (secular equilibrium), with
+        # slight variation to simulate real-world; one vectorized draw
+        # covers the whole chain
         base_activity = rng.uniform(*activity_range)
-        sources = []
-        for iso in VALID_U238_CHAIN:
-            # Slight variation to simulate real-world
-            activity = base_activity * rng.uniform(0.8, 1.2)
-            sources.append(IsotopeSource(iso, activity, include_daughters=False))
-        return sources
+        multipliers = rng.uniform(0.8, 1.2, size=VALID_U238_CHAIN.size)
+        return [
+            IsotopeSource(iso, base_activity * m, include_daughters=False)
+            for iso, m in zip(VALID_U238_CHAIN, multipliers)
+        ]
 
 
 class ThoriumChainScenario(SampleScenario):
@@ -190,11 +205,11 @@ class ThoriumChainScenario(SampleScenario):
     
     def generate_sources(self, rng, activity_range) -> List[IsotopeSource]:
         base_activity = rng.uniform(*activity_range)
-        sources = []
-        for iso in VALID_TH232_CHAIN:
-            activity = base_activity * rng.uniform(0.8, 1.2)
-            sources.append(IsotopeSource(iso, activity, include_daughters=False))
-        return sources
+        multipliers = rng.uniform(0.8, 1.2, size=VALID_TH232_CHAIN.size)
+        return [
+            IsotopeSource(iso, base_activity * m, include_daughters=False)
+            for iso, m in zip(VALID_TH232_CHAIN, multipliers)
+        ]
 
 
 class NORMScenario(SampleScenario):
@@ -206,7 +221,10 @@ class NORMScenario(SampleScenario):
     def generate_sources(self, rng, activity_range) -> List[IsotopeSource]:
         # Pick 2-4 NORM isotopes
         num_isotopes = rng.integers(2, 5)
-        selected = rng.choice(VALID_NORM, size=min(num_isotopes, len(VALID_NORM)), replace=False)
+        # Permutation-and-slice replaces choice(replace=False), which
+        # re-derives the draw plan per call
+        size = min(num_isotopes, len(VALID_NORM))
+        selected = VALID_NORM[rng.permutation(VALID_NORM.size)[:size]]
         
         sources = []
         for iso in selected:
@@ -250,7 +268,9 @@ class MixedSourcesScenario(SampleScenario):
     
     def generate_sources(self, rng, activity_range) -> List[IsotopeSource]:
         num_isotopes = rng.integers(2, 4)
-        selected = rng.choice(ALL_VALID_ISOTOPES, size=num_isotopes, replace=False)
+        selected = ALL_VALID_ISOTOPES[
+            rng.permutation(ALL_VALID_ISOTOPES.size)[:num_isotopes]
+        ]
         
         sources = []
         for iso in selected:
@@ -274,14 +294,14 @@ class ComplexMixScenario(SampleScenario):
         for pool in pools:
             if len(selected) >= num_isotopes:
                 break
-            if pool:
-                iso = rng.choice(pool)
-                selected.add(iso)
+            if pool.size:
+                selected.add(pool[rng.integers(pool.size)])
         
         # Fill remaining with random
         while len(selected) < num_isotopes:
-            iso = rng.choice(ALL_VALID_ISOTOPES)
-            selected.add(iso)
+            selected.add(
+                ALL_VALID_ISOTOPES[rng.integers(ALL_VALID_ISOTOPES.size)]
+            )
         
         sources = []
         for iso in selected:
@@ -300,7 +320,7 @@ class WeakSourceScenario(SampleScenario):
         # Very low activity - near background
         weak_activity_range = (0.1, 5.0)  # Much weaker than normal
         
-        isotope = rng.choice(ALL_VALID_ISOTOPES)
+        isotope = ALL_VALID_ISOTOPES[rng.integers(ALL_VALID_ISOTOPES.size)]
         activity = rng.uniform(*weak_activity_range)
         return [IsotopeSource(isotope, activity, include_daughters=True)]
 
@@ -344,11 +364,14 @@ class BackgroundConfig:
     
     def sample(self, rng: np.random.Generator) -> dict:
         """Sample a random background configuration."""
+        # One vectorized draw instead of four Generator dispatches
+        v = rng.random(4)
         return {
-            'background_cps': rng.uniform(self.intensity_min, self.intensity_max) * 5.0,
-            'include_k40': rng.random() < self.k40_prob,
-            'include_radon': rng.random() < self.radon_prob,
-            'include_thorium': rng.random() < self.thorium_prob,
+            'background_cps': (self.intensity_min
+                               + v[0] * (self.intensity_max - self.intensity_min)) * 5.0,
+            'include_k40': v[1] < self.k40_prob,
+            'include_radon': v[2] < self.radon_prob,
+            'include_thorium': v[3] < self.thorium_prob,
         }
 
 
@@ -356,30 +379,72 @@ class BackgroundConfig:
 # SAMPLE GENERATION
 # =============================================================================
 
-def generate_single_sample(args: Tuple[int, dict]) -> Optional[str]:
+# Per-worker state installed once by the pool initializer, so each task
+# ships only (sample_idx, seed) instead of re-pickling the shared config
+# dict and scenario objects per item
+_WORKER_STATE: dict = {}
+
+# Generators keyed by detector name, so back-to-back batch runs in one
+# process (tests, notebooks) reuse the initialized generator as well
+_GEN_CACHE: Dict[str, SpectrumGenerator] = {}
+
+
+def _get_worker_generator(detector_name: str) -> SpectrumGenerator:
+    generator = _GEN_CACHE.get(detector_name)
+    if generator is None:
+        generator = SpectrumGenerator(
+            detector_config=RADIACODE_CONFIGS.get(detector_name)
+        )
+        _GEN_CACHE[detector_name] = generator
+    return generator
+
+
+def _init_worker(config: dict) -> None:
+    """Pool initializer: stash the shared config and build the worker's
+    generator once."""
+    _WORKER_STATE['config'] = config
+    _WORKER_STATE['generator'] = _get_worker_generator(config['detector_name'])
+    # One Path per worker instead of one per sample
+    _WORKER_STATE['spectra_dir'] = Path(config['output_dir']) / "spectra"
+    _WORKER_STATE['scenario_cum_probs'] = config['scenario_cum_probs']
+
+
+def generate_single_sample(
+    args: Tuple[int, np.random.SeedSequence]
+):
     """
     Generate a single sample for parallel processing.
     
     Args:
-        args: Tuple of (sample_index, config_dict)
+        args: Tuple of (sample_index, seed_sequence); the shared config
+            comes from the worker state set up by _init_worker
     
     Returns:
-        Sample ID if successful, None if failed
+        Sample ID string if successful, else an (sample_index, error)
+        tuple for the parent to aggregate
     """
-    sample_idx, config = args
+    sample_idx, seed_seq = args
+    config = _WORKER_STATE['config']
     
     try:
-        # Create RNG with unique seed per sample
-        rng = np.random.default_rng(config['base_seed'] + sample_idx)
+        # Each sample gets its own spawned SeedSequence: statistically
+        # independent PCG64 streams, unlike base_seed + idx arithmetic
+        rng = np.random.default_rng(seed_seq)
+        # The physics layer still draws from the legacy global RNG; seed
+        # it from the same sequence so samples stay reproducible even
+        # when worker processes are reused
+        np.random.seed(seed_seq.generate_state(1)[0])
         
-        # Initialize generator
-        detector_config = RADIACODE_CONFIGS.get(config['detector_name'])
-        generator = SpectrumGenerator(detector_config=detector_config)
+        # Worker-resident generator built once in _init_worker
+        generator = _WORKER_STATE['generator']
         
-        # Select scenario based on cumulative probabilities
+        # Select scenario against the cumulative probabilities computed
+        # once in the parent: one uniform draw plus a binary search, no
+        # per-sample cumsum or object-array construction
         scenarios = config['scenarios']
-        scenario_probs = [s.fraction for s in scenarios]
-        scenario = rng.choice(scenarios, p=scenario_probs)
+        scenario = scenarios[int(np.searchsorted(
+            _WORKER_STATE['scenario_cum_probs'], rng.random()
+        ))]
         
         # Generate sources for this scenario
         sources = scenario.generate_sources(rng, config['activity_range'])
@@ -411,21 +476,52 @@ def generate_single_sample(args: Tuple[int, dict]) -> Optional[str]:
         spectrum = generator.generate_spectrum(spec_config)
         
         # Save spectrum
-        output_dir = Path(config['output_dir']) / "spectra"
-        save_spectrum(
-            spectrum,
-            output_dir,
-            save_image=True,   # Save NPY file
-            image_format='npy'  # Skip PNG for speed
-        )
+        shard_dir = config.get('shard_dir')
+        if shard_dir:
+            # Sharded mode: write straight into this worker's memmapped
+            # shard row instead of one .npy + .json per sample
+            writer = get_worker_memmap_writer(
+                shard_dir, spectrum.data.shape, spectrum.data.dtype
+            )
+            writer.add(spectrum.sample_id, spectrum.data, spectrum.labels)
+        else:
+            save_spectrum(
+                spectrum,
+                _WORKER_STATE['spectra_dir'],
+                save_image=True,   # Save NPY file
+                image_format='npy'  # Skip PNG for speed
+            )
         
         return spectrum.sample_id
         
     except Exception as e:
-        print(f"Error generating sample {sample_idx}: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+        # No printing here: formatting a traceback serializes every
+        # worker through the stderr lock during a failure storm (disk
+        # full and the like). The parent aggregates and summarizes.
+        return (sample_idx, repr(e))
+
+
+def _progress_loop(progress: dict, num_samples: int, start_time: float,
+                   stop_event: threading.Event) -> None:
+    """
+    Print progress once per second from a background thread.
+
+    The result-collection loop only increments counters, so stdout
+    formatting and flushing never sit on the critical path between the
+    parent and the workers.
+    """
+    while not stop_event.wait(1.0):
+        completed = progress['completed']
+        failed = progress['failed']
+        total = completed + failed
+        elapsed = time.time() - start_time
+        rate = completed / elapsed if elapsed > 0 else 0
+        eta = (num_samples - total) / rate if rate > 0 else 0
+
+        print(f"\r  Progress: {total:,}/{num_samples:,} ({100*total/num_samples:.1f}%) | "
+              f"Rate: {rate:.1f}/s | "
+              f"ETA: {eta/60:.1f}m | "
+              f"Failed: {failed}", end="", flush=True)
 
 
 def generate_training_data_v3(
@@ -437,6 +533,8 @@ def generate_training_data_v3(
     scenarios: Optional[List[SampleScenario]] = None,
     num_workers: int = None,
     random_seed: int = None,
+    sharded: bool = False,
+    max_tasks_per_worker: int = 2000,
 ) -> int:
     """
     Generate training samples in parallel.
@@ -450,6 +548,11 @@ def generate_training_data_v3(
         scenarios: List of SampleScenario objects (default: DEFAULT_SCENARIOS)
         num_workers: Number of parallel workers
         random_seed: Base random seed
+        sharded: Bundle samples into per-worker shard files under
+            output_dir/shards instead of one .npy + .json per sample
+        max_tasks_per_worker: Recycle each worker process after this
+            many samples so heap fragmentation and leaked allocations
+            cannot grow without bound over a long run
     
     Returns:
         Number of successfully generated samples
@@ -463,15 +566,23 @@ def generate_training_data_v3(
     if scenarios is None:
         scenarios = DEFAULT_SCENARIOS
     
-    # Normalize scenario fractions
-    total_fraction = sum(s.fraction for s in scenarios)
-    for s in scenarios:
-        s.fraction /= total_fraction
+    # Normalize into a standalone probability array rather than mutating
+    # scenario.fraction in place: reusing one scenario list across calls
+    # would otherwise renormalize already-normalized fractions, drifting
+    # them run over run
+    scenario_probs = np.array([s.fraction for s in scenarios],
+                              dtype=np.float64)
+    scenario_probs /= scenario_probs.sum()
+    scenario_cum_probs = np.cumsum(scenario_probs)
     
     # Create output directory
     output_dir = Path(output_dir)
-    spectra_dir = output_dir / "spectra"
-    spectra_dir.mkdir(parents=True, exist_ok=True)
+    if sharded:
+        shard_dir = output_dir / "shards"
+        shard_dir.mkdir(parents=True, exist_ok=True)
+    else:
+        spectra_dir = output_dir / "spectra"
+        spectra_dir.mkdir(parents=True, exist_ok=True)
     
     print(f"=" * 70)
     print(f"SYNTHETIC SPECTRA GENERATION v3 - Optimized for 2D Model")
@@ -484,9 +595,9 @@ def generate_training_data_v3(
     print(f"  Activity range: {activity_range[0]:.1f} - {activity_range[1]:.1f} Bq")
     print(f"  Workers: {num_workers}")
     print(f"\nScenario distribution:")
-    for s in scenarios:
-        count = int(num_samples * s.fraction)
-        print(f"  {s.name}: {s.fraction*100:.1f}% (~{count:,} samples)")
+    for s, prob in zip(scenarios, scenario_probs):
+        count = int(num_samples * prob)
+        print(f"  {s.name}: {prob*100:.1f}% (~{count:,} samples)")
     print()
     
     # Shared config for all workers
@@ -496,45 +607,80 @@ def generate_training_data_v3(
         'activity_range': activity_range,
         'bg_intensity_min': bg_intensity_range[0],
         'bg_intensity_max': bg_intensity_range[1],
-        'base_seed': random_seed,
         'scenarios': scenarios,
+        'scenario_cum_probs': scenario_cum_probs,
+        'shard_dir': str(shard_dir) if sharded else None,
     }
     
     # Create work items
-    work_items = [(i, shared_config) for i in range(num_samples)]
+    ss = np.random.SeedSequence(random_seed)
+    child_seeds = ss.spawn(num_samples)
+    work_items = [(i, child_seeds[i]) for i in range(num_samples)]
     
-    # Progress tracking
+    # Progress tracking: the collection loop bumps these counters and a
+    # background thread does the printing
     start_time = time.time()
-    completed = 0
-    failed = 0
-    last_report = 0
+    progress = {'completed': 0, 'failed': 0}
+    errors: List[Tuple[int, str]] = []
+    stop_event = threading.Event()
+    reporter = threading.Thread(
+        target=_progress_loop,
+        args=(progress, num_samples, start_time, stop_event),
+    )
+    reporter.start()
     
     print(f"Starting generation...")
     
-    # Generate in parallel
-    with Pool(num_workers) as pool:
-        for result in pool.imap_unordered(generate_single_sample, work_items, chunksize=100):
-            if result is not None:
-                completed += 1
+    # Start-method choice: fork (Linux) hands workers copy-on-write
+    # access to shared_config, the isotope pools, and the scenario list
+    # with zero pickling, but is incompatible with worker recycling;
+    # elsewhere the executor runs under spawn and keeps
+    # max_tasks_per_child to hold RSS flat over long runs
+    if sys.platform.startswith('linux'):
+        mp_context = get_context('fork')
+        max_tasks = None
+    else:
+        mp_context = get_context('spawn')
+        max_tasks = max_tasks_per_worker
+
+    # Generate in parallel. ProcessPoolExecutor instead of Pool for
+    # max_tasks_per_child: long-lived workers otherwise accumulate heap
+    # fragmentation across tens of thousands of samples, so each one is
+    # recycled after a bounded number of tasks to keep RSS flat
+    with ProcessPoolExecutor(max_workers=num_workers,
+                             mp_context=mp_context,
+                             max_tasks_per_child=max_tasks,
+                             initializer=_init_worker,
+                             initargs=(shared_config,)) as executor:
+        for result in executor.map(generate_single_sample, work_items, chunksize=100):
+            if isinstance(result, str):
+                progress['completed'] += 1
             else:
-                failed += 1
-            
-            total = completed + failed
-            
-            # Progress report every 1%
-            if total - last_report >= num_samples // 100 or total == num_samples:
-                elapsed = time.time() - start_time
-                rate = completed / elapsed if elapsed > 0 else 0
-                eta = (num_samples - total) / rate if rate > 0 else 0
-                
-                print(f"\r  Progress: {total:,}/{num_samples:,} ({100*total/num_samples:.1f}%) | "
-                      f"Rate: {rate:.1f}/s | "
-                      f"ETA: {eta/60:.1f}m | "
-                      f"Failed: {failed}", end="", flush=True)
-                last_report = total
+                progress['failed'] += 1
+                errors.append(result)
+    
+    stop_event.set()
+    reporter.join()
+    completed = progress['completed']
+    failed = progress['failed']
     
     total_time = time.time() - start_time
     
+    if sharded:
+        manifest_path = write_manifest(shard_dir)
+        print(f"\n  Manifest: {manifest_path}")
+    
+    if errors:
+        # Summarize distinct failure modes instead of one traceback per
+        # failed sample
+        print(f"\n\n{len(errors)} samples failed. Distinct errors:")
+        distinct: Dict[str, int] = {}
+        for _, err in errors:
+            distinct[err] = distinct.get(err, 0) + 1
+        for err, count in sorted(distinct.items(),
+                                 key=lambda kv: -kv[1])[:5]:
+            print(f"  [{count}x] {err}")
+
     print(f"\n\nGeneration complete!")
     print(f"  Total time: {total_time/60:.1f} minutes")
     print(f"  Successful: {completed:,}")
@@ -560,6 +706,9 @@ def main():
                         help='Minimum activity in Bq')
     parser.add_argument('--activity_max', type=float, default=100.0,
                         help='Maximum activity in Bq')
+    parser.add_argument('--sharded', action='store_true',
+                        help='Bundle samples into per-worker shard files '
+                             'instead of one .npy + .json per sample')
     
     args = parser.parse_args()
     
@@ -570,6 +719,7 @@ def main():
         activity_range=(args.activity_min, args.activity_max),
         num_workers=args.workers,
         random_seed=args.seed,
+        sharded=args.sharded,
     )
 
 
@@ -0,0 +1,631 @@
+"""
+Synthetic Spectra Generation Script v4
+
+Flat-output rewrite aimed at very large (100k+) training runs:
+- Long 300-second observations (300 time intervals) for the 2D model
+- uint8 spectrum storage: affine quantization of the normalized 0-1
+  data (scale 1/255), a quarter of float32 on disk and off it
+- Compact binary labels (a few tens of bytes per sample) instead of
+  JSON sidecars, via pack_labels/unpack_labels
+- Function-based scenario table instead of scenario classes
+
+Isotope pools are shared with v3 rather than re-declared here.
+
+Usage:
+    python -m synthetic_spectra.generate_spectra_v4 --num_samples 200000 --workers 8
+"""
+
+import argparse
+import sys
+from pathlib import Path
+import json
+import struct
+import numpy as np
+from multiprocessing import Pool, Value, cpu_count
+import time
+from typing import Dict, List, Optional, Tuple
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from synthetic_spectra.generator import (
+    SpectrumGenerator,
+    SpectrumConfig,
+    IsotopeSource,
+)
+from synthetic_spectra.generate_spectra_v3 import (
+    ALL_VALID_ISOTOPES,
+    VALID_CALIBRATION,
+    VALID_MEDICAL,
+    VALID_INDUSTRIAL,
+    VALID_U238_CHAIN,
+    VALID_TH232_CHAIN,
+    BackgroundConfig,
+)
+from synthetic_spectra.config import RADIACODE_CONFIGS
+
+
+# =============================================================================
+# BINARY LABEL FORMAT
+# =============================================================================
+#
+# One label record:
+#   [0]                  num_isotopes (uint8, capped at 255)
+#   [1 : 1+n]            isotope indices (uint8 each, see ISOTOPE_INDEX)
+#   [1+n : 1+3n]         activities (uint16 little-endian each;
+#                        Bq * 65.535, so 0-1000 Bq at ~0.015 Bq steps)
+#   [1+3n]               background flag byte (bit0 K-40, bit1 radon,
+#                        bit2 thorium)
+#
+# Index 0 is reserved for "unknown"; real isotopes start at 1.
+
+ISOTOPE_INDEX: Dict[str, int] = {
+    name: i + 1 for i, name in enumerate(ALL_VALID_ISOTOPES)
+}
+INDEX_ISOTOPE: Dict[int, str] = {v: k for k, v in ISOTOPE_INDEX.items()}
+
+
+def _isotope_index_bytes(isotopes: List[str]) -> bytes:
+    """
+    Map isotope names to their uint8 record indices, vectorized.
+
+    ALL_VALID_ISOTOPES is sorted, so a searchsorted against it yields
+    every index in one pass with no per-name dict lookups; names outside
+    the table map to the reserved 0 ("unknown").
+    """
+    if not isotopes:
+        return b""
+    names = np.asarray(isotopes)
+    pos = np.searchsorted(ALL_VALID_ISOTOPES, names)
+    clipped = np.minimum(pos, ALL_VALID_ISOTOPES.size - 1)
+    known = ALL_VALID_ISOTOPES[clipped] == names
+    return ((clipped + 1) * known).astype(np.uint8).tobytes()
+
+FLAG_K40 = 0x01
+FLAG_RADON = 0x02
+FLAG_THORIUM = 0x04
+
+# Activity quantization: uint16 full scale maps to 1000 Bq
+_ACTIVITY_SCALE = 65.535
+_ACTIVITY_MAX_BQ = 1000.0
+
+# Precompiled at module load: struct.pack('<H', ...) re-parses the
+# format string on every call, and unpack_from avoids the byte-slice
+# allocation that unpack(data[o:o+2]) makes
+_U16 = struct.Struct('<H')
+_u16_unpack_from = _U16.unpack_from
+
+
+def pack_labels(
+    isotopes: List[str],
+    activities: Dict[str, float],
+    flag_byte: int,
+) -> bytes:
+    """
+    Encode one sample's labels as a compact binary record.
+
+    Args:
+        isotopes: Isotope names present in the sample
+        activities: Activity in Bq per isotope name
+        flag_byte: Background composition flags (FLAG_* bits)
+
+    Returns:
+        Label record bytes (see format comment above)
+    """
+    isotopes = isotopes[:255]
+    indices = _isotope_index_bytes(isotopes)
+    # Scale, clip, and quantize all activities in one vectorized pass;
+    # '<u2' keeps the record little-endian regardless of host order
+    acts = np.fromiter(
+        (activities.get(iso, 0.0) for iso in isotopes),
+        dtype=np.float64, count=len(isotopes)
+    )
+    scaled = np.clip(acts * _ACTIVITY_SCALE, 0, 65535).astype('<u2')
+    return (bytes((len(isotopes),)) + indices + scaled.tobytes()
+            + bytes((flag_byte & 0xFF,)))
+
+
+def unpack_labels(data: bytes, offset: int = 0) -> Dict:
+    """
+    Decode one label record produced by pack_labels.
+
+    Args:
+        data: Buffer holding the record
+        offset: Byte offset of the record within the buffer
+
+    Returns:
+        Dict with 'isotopes', 'activities' (Bq), and the three
+        background inclusion booleans
+    """
+    num_isotopes = data[offset]
+    idx_start = offset + 1
+    act_start = idx_start + num_isotopes
+
+    isotopes = []
+    activities = {}
+    for i in range(num_isotopes):
+        name = INDEX_ISOTOPE.get(data[idx_start + i], "unknown")
+        raw = _u16_unpack_from(data, act_start + 2 * i)[0]
+        isotopes.append(name)
+        activities[name] = raw / _ACTIVITY_SCALE
+
+    flags = data[act_start + 2 * num_isotopes]
+    return {
+        'isotopes': isotopes,
+        'activities': activities,
+        'include_k40': bool(flags & FLAG_K40),
+        'include_radon': bool(flags & FLAG_RADON),
+        'include_thorium': bool(flags & FLAG_THORIUM),
+    }
+
+
+def label_record_size(num_isotopes: int) -> int:
+    """Byte length of a packed record with the given isotope count."""
+    return 1 + 3 * num_isotopes + 1
+
+
+# labels.bin holds one zero-padded record per sample at a fixed stride,
+# so label lookup is a constant-offset read. Scenarios top out well
+# below this isotope count.
+MAX_LABEL_ISOTOPES = 10
+LABEL_STRIDE = label_record_size(MAX_LABEL_ISOTOPES)
+
+
+if hasattr(os, 'pwrite'):
+    # One positioned-write syscall per record, no BufferedWriter
+    _write_at = os.pwrite
+else:
+    def _write_at(fd: int, data: bytes, offset: int) -> int:
+        """lseek + write fallback for platforms without pwrite (Windows)."""
+        os.lseek(fd, offset, os.SEEK_SET)
+        return os.write(fd, data)
+
+
+# =============================================================================
+# SCENARIOS - plain functions drawing sources, weighted by SCENARIOS
+# =============================================================================
+
+def generate_background(rng, activity_range) -> List[IsotopeSource]:
+    """No sources - background only."""
+    return []
+
+
+def generate_single(rng, activity_range) -> List[IsotopeSource]:
+    """One isotope from any pool."""
+    isotope = ALL_VALID_ISOTOPES[rng.integers(ALL_VALID_ISOTOPES.size)]
+    return [IsotopeSource(isotope, rng.uniform(*activity_range),
+                          include_daughters=True)]
+
+
+def generate_dual(rng, activity_range) -> List[IsotopeSource]:
+    """Two distinct isotopes."""
+    picks = ALL_VALID_ISOTOPES[
+        rng.permutation(ALL_VALID_ISOTOPES.size)[:2]
+    ]
+    return [
+        IsotopeSource(iso, rng.uniform(*activity_range),
+                      include_daughters=True)
+        for iso in picks
+    ]
+
+
+def generate_chain(rng, activity_range) -> List[IsotopeSource]:
+    """A natural decay chain near secular equilibrium."""
+    chain = VALID_U238_CHAIN if rng.random() < 0.5 else VALID_TH232_CHAIN
+    base_activity = rng.uniform(*activity_range)
+    multipliers = rng.uniform(0.8, 1.2, size=chain.size)
+    return [
+        IsotopeSource(iso, base_activity * m, include_daughters=False)
+        for iso, m in zip(chain, multipliers)
+    ]
+
+
+def generate_complex(rng, activity_range) -> List[IsotopeSource]:
+    """4-6 isotopes spanning several pools."""
+    num_isotopes = int(rng.integers(4, 7))
+
+    # Seed variety with one representative per pool, then top up from
+    # the remaining isotopes with a permutation slice: a fixed number of
+    # draws instead of the old set + retry-until-distinct loop, and the
+    # result order no longer depends on string hashing
+    seeds = np.unique([
+        pool[rng.integers(pool.size)]
+        for pool in (VALID_CALIBRATION, VALID_MEDICAL, VALID_INDUSTRIAL)
+        if pool.size
+    ])
+    remaining = np.setdiff1d(ALL_VALID_ISOTOPES, seeds)
+    extra = remaining[
+        rng.permutation(remaining.size)[:num_isotopes - seeds.size]
+    ]
+    selected = np.concatenate([seeds, extra])
+
+    return [
+        IsotopeSource(iso, rng.uniform(*activity_range),
+                      include_daughters=True)
+        for iso in selected
+    ]
+
+
+# (name, weight, source function)
+SCENARIOS = [
+    ("background", 0.15, generate_background),
+    ("single", 0.35, generate_single),
+    ("dual", 0.20, generate_dual),
+    ("chain", 0.15, generate_chain),
+    ("complex", 0.15, generate_complex),
+]
+
+# Selection invariants frozen at import: normalized weights, their
+# cumulative distribution, and the function table, so workers never
+# renormalize or rebuild arrays per sample
+_SCENARIO_PROBS = np.array([s[1] for s in SCENARIOS], dtype=np.float64)
+_SCENARIO_PROBS /= _SCENARIO_PROBS.sum()
+_SCENARIO_CUM = np.cumsum(_SCENARIO_PROBS)
+_SCENARIO_NAMES = [s[0] for s in SCENARIOS]
+_SCENARIO_FUNCS = [s[2] for s in SCENARIOS]
+
+
+# =============================================================================
+# SAMPLE GENERATION
+# =============================================================================
+
+# Fixed observation geometry for the 2D model
+DURATION_SECONDS = 300.0
+INTERVAL_SECONDS = 1.0
+NUM_INTERVALS = int(DURATION_SECONDS / INTERVAL_SECONDS)
+
+# This worker's handle on the run-wide spectra memmap, opened once per
+# process on first use
+_WORKER_MMAP: Optional[np.ndarray] = None
+
+
+def _get_worker_mmap(config: dict) -> np.ndarray:
+    global _WORKER_MMAP
+    if _WORKER_MMAP is None:
+        _WORKER_MMAP = np.lib.format.open_memmap(
+            config['spectra_path'], mode='r+'
+        )
+    return _WORKER_MMAP
+
+
+# Samples per pool task: coarse enough that task dispatch and result
+# pickling stop mattering (a few hundred IPC round-trips per 100k
+# samples instead of 100k), fine enough to load-balance across workers
+BATCH_SIZE = 256
+
+# Per-worker state installed once by the pool initializer - the shared
+# config and the generator live for the worker's whole lifetime instead
+# of being rebuilt per batch
+_WORKER_STATE: dict = {}
+
+
+def _init_worker(config: dict, worker_slot) -> None:
+    """Pool initializer: stash the shared config and build this
+    worker's generator once."""
+    # One process per core is the parallelism here; BLAS threads inside
+    # NumPy would only oversubscribe. Env vars can't cap them at this
+    # point - the BLAS library read them when it was loaded, before the
+    # worker forked - so go through threadpoolctl, which talks to the
+    # already-loaded pools directly.
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+    # Pin each worker to one core so they stop migrating under load.
+    # Workers claim consecutive slots from a shared counter; the counter
+    # is only passed on platforms with sched_setaffinity (Linux), where
+    # pools fork and inherit it.
+    if worker_slot is not None and hasattr(os, 'sched_setaffinity'):
+        with worker_slot.get_lock():
+            slot = worker_slot.value
+            worker_slot.value += 1
+        os.sched_setaffinity(0, {slot % cpu_count()})
+
+    _WORKER_STATE['config'] = config
+    _WORKER_STATE['generator'] = SpectrumGenerator(
+        detector_config=RADIACODE_CONFIGS.get(config['detector_name'])
+    )
+
+
+def generate_sample_batch(items: List[Tuple[int, np.random.SeedSequence]]
+                          ) -> List[Tuple]:
+    """
+    Generate a batch of samples on one worker.
+
+    Args:
+        items: (sample_index, seed_sequence) pairs for this batch;
+            config and generator come from the worker state set up by
+            _init_worker
+
+    Returns:
+        One (sample_index, label_bytes) tuple per successful sample and
+        (sample_index, error_string) per failure, for the parent to
+        write and aggregate
+    """
+    config = _WORKER_STATE['config']
+    generator = _WORKER_STATE['generator']
+    return [
+        _generate_one_sample(sample_idx, seed_seq, config, generator)
+        for sample_idx, seed_seq in items
+    ]
+
+
+def _generate_one_sample(sample_idx: int, seed_seq: np.random.SeedSequence,
+                         config: dict, generator: SpectrumGenerator):
+    """
+    Generate one sample: quantized spectrogram row plus packed label.
+
+    Returns:
+        (sample_index, label_bytes) if successful, else a
+        (sample_index, error_string) tuple
+    """
+    try:
+        # Spawned SeedSequence children give independent streams without
+        # re-hashing an integer seed into PCG64 state per sample
+        rng = np.random.default_rng(seed_seq)
+        # Physics-layer draws still come from the legacy global RNG
+        np.random.seed(int(seed_seq.generate_state(1)[0]))
+
+        # Pick a scenario: one uniform draw against the import-time CDF
+        scenario_idx = int(np.searchsorted(_SCENARIO_CUM, rng.random()))
+        sources = _SCENARIO_FUNCS[scenario_idx](rng, config['activity_range'])
+
+        bg_config = BackgroundConfig(
+            intensity_min=config.get('bg_intensity_min', 0.3),
+            intensity_max=config.get('bg_intensity_max', 3.0),
+        )
+        bg_params = bg_config.sample(rng)
+
+        spec_config = SpectrumConfig(
+            duration_seconds=DURATION_SECONDS,
+            time_interval_seconds=INTERVAL_SECONDS,
+            sources=sources,
+            include_background=True,
+            background_cps=bg_params['background_cps'],
+            include_k40=bg_params['include_k40'],
+            include_radon=bg_params['include_radon'],
+            include_thorium=bg_params['include_thorium'],
+            detector_name=config['detector_name'],
+        )
+
+        spectrum = generator.generate_spectrum(spec_config)
+        sample_id = f"{sample_idx:08d}"
+
+        # Write this sample's row of the run-wide spectra memmap; no NPY
+        # header encoding or file creation per sample, and the OS flushes
+        # dirty pages in the background. Data is normalized 0-1, so
+        # uint8 at scale 1/255 covers the full dynamic range; the loader
+        # dequantizes with arr.astype(np.float32) * (1/255)
+        mmap = _get_worker_mmap(config)
+        mmap[sample_idx] = (np.clip(spectrum.data, 0.0, 1.0) * 255.0
+                            + 0.5).astype(np.uint8)
+
+        # Packed binary label, returned to the parent: one small bytes
+        # payload over the result pipe instead of a file per sample
+        flag_byte = (
+            (FLAG_K40 if bg_params['include_k40'] else 0)
+            | (FLAG_RADON if bg_params['include_radon'] else 0)
+            | (FLAG_THORIUM if bg_params['include_thorium'] else 0)
+        )
+        activities = {src.isotope_name: src.activity_bq for src in sources}
+        label_data = pack_labels(
+            [src.isotope_name for src in sources], activities, flag_byte
+        )
+
+        return (sample_idx, label_data)
+
+    except Exception as e:
+        return (sample_idx, repr(e))
+
+
+# =============================================================================
+# MAIN BATCH GENERATION
+# =============================================================================
+
+def generate_training_data_v4(
+    num_samples: int,
+    output_dir: Path,
+    detector_name: str = "radiacode_103",
+    activity_range: Tuple[float, float] = (1.0, 100.0),
+    bg_intensity_range: Tuple[float, float] = (0.3, 3.0),
+    num_workers: int = None,
+    random_seed: int = None,
+) -> int:
+    """
+    Generate v4 training samples in parallel.
+
+    Args:
+        num_samples: Total number of samples to generate
+        output_dir: Output directory
+        detector_name: Detector to simulate
+        activity_range: (min, max) activity in Bq
+        bg_intensity_range: Background intensity multiplier range
+        num_workers: Number of parallel workers
+        random_seed: Base random seed
+
+    Returns:
+        Number of successfully generated samples
+    """
+    if num_workers is None:
+        num_workers = max(1, cpu_count() - 1)
+
+    if random_seed is None:
+        random_seed = int(time.time())
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Preallocate one (num_samples, T, channels) uint8 .npy for the
+    # whole run; workers open it r+ and write their own rows. Replaces
+    # num_samples tiny files (and their metadata churn) with one
+    # sequential-friendly memmap that training can load with
+    # np.load(..., mmap_mode='r')
+    detector_config = RADIACODE_CONFIGS.get(detector_name)
+    num_channels = detector_config.get_energy_bins().size
+    spectra_path = output_dir / "spectra.npy"
+    spectra = np.lib.format.open_memmap(
+        spectra_path, mode='w+', dtype=np.uint8,
+        shape=(num_samples, NUM_INTERVALS, num_channels)
+    )
+    del spectra  # header is on disk; workers reopen their own handles
+
+    print(f"=" * 70)
+    print(f"SYNTHETIC SPECTRA GENERATION v4 - flat storage, binary labels")
+    print(f"=" * 70)
+    print(f"\nConfiguration:")
+    print(f"  Samples: {num_samples:,}")
+    print(f"  Output: {output_dir}")
+    print(f"  Detector: {detector_name}")
+    print(f"  Duration: {DURATION_SECONDS:.0f} seconds "
+          f"({int(DURATION_SECONDS / INTERVAL_SECONDS)} intervals)")
+    print(f"  Activity range: {activity_range[0]:.1f} - {activity_range[1]:.1f} Bq")
+    print(f"  Workers: {num_workers}")
+    print()
+
+    shared_config = {
+        'detector_name': detector_name,
+        'output_dir': str(output_dir),
+        'activity_range': activity_range,
+        'bg_intensity_min': bg_intensity_range[0],
+        'bg_intensity_max': bg_intensity_range[1],
+        'base_seed': random_seed,
+        'spectra_path': str(spectra_path),
+    }
+
+    # Coarse batches: BATCH_SIZE samples per task; the config rides in
+    # through the initializer, not each task. Each sample ships with its
+    # own SeedSequence child spawned from the base seed.
+    child_seeds = np.random.SeedSequence(random_seed).spawn(num_samples)
+    work_items = [
+        [(i, child_seeds[i]) for i in range(start,
+                                            min(start + BATCH_SIZE,
+                                                num_samples))]
+        for start in range(0, num_samples, BATCH_SIZE)
+    ]
+
+    start_time = time.time()
+    completed = 0
+    failed = 0
+    errors: List[Tuple[int, str]] = []
+    last_report = 0
+
+    print(f"Starting generation...")
+
+    # One labels.bin for the run, preallocated at a fixed stride and
+    # filled by the parent as results stream in; failed samples leave an
+    # all-zero record (num_isotopes 0, no flags). Raw fd + pwrite keeps
+    # each record at one positioned syscall with no BufferedWriter or
+    # seek in between.
+    labels_path = output_dir / "labels.bin"
+    labels_fd = os.open(
+        str(labels_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644
+    )
+    os.truncate(labels_fd, num_samples * LABEL_STRIDE)
+
+    # Shared slot counter for core pinning; inheritable under fork only,
+    # so platforms without affinity control skip it
+    worker_slot = Value('i', 0) if hasattr(os, 'sched_setaffinity') else None
+
+    with Pool(num_workers, initializer=_init_worker,
+              initargs=(shared_config, worker_slot)) as pool:
+        for batch in pool.imap_unordered(generate_sample_batch, work_items):
+            for result in batch:
+                sample_idx, payload = result
+                if isinstance(payload, bytes):
+                    completed += 1
+                    _write_at(labels_fd, payload,
+                              sample_idx * LABEL_STRIDE)
+                else:
+                    failed += 1
+                    errors.append(result)
+
+            total = completed + failed
+            if total - last_report >= max(1, num_samples // 100) \
+                    or total == num_samples:
+                elapsed = time.time() - start_time
+                rate = completed / elapsed if elapsed > 0 else 0
+                eta = (num_samples - total) / rate if rate > 0 else 0
+                print(f"\r  Progress: {total:,}/{num_samples:,} "
+                      f"({100*total/num_samples:.1f}%) | "
+                      f"Rate: {rate:.1f}/s | ETA: {eta/60:.1f}m | "
+                      f"Failed: {failed}", end="", flush=True)
+                last_report = total
+
+    os.close(labels_fd)
+
+    total_time = time.time() - start_time
+
+    # Run-level metadata so readers don't have to guess shapes/dtypes
+    metadata = {
+        'version': 4,
+        'num_samples': num_samples,
+        'detector': detector_name,
+        'duration_seconds': DURATION_SECONDS,
+        'interval_seconds': INTERVAL_SECONDS,
+        'spectra_file': 'spectra.npy',
+        'spectra_dtype': 'uint8',
+        'spectra_scale': 1.0 / 255.0,
+        'spectra_zero_point': 0,
+        'labels_file': 'labels.bin',
+        'label_stride': LABEL_STRIDE,
+        'label_format': 'u8 count, u8 indices, u16le activities '
+                        '(Bq*65.535), u8 flags',
+        'base_seed': random_seed,
+    }
+    with open(output_dir / "metadata.json", 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    if errors:
+        print(f"\n\n{len(errors)} samples failed. Distinct errors:")
+        distinct: Dict[str, int] = {}
+        for _, err in errors:
+            distinct[err] = distinct.get(err, 0) + 1
+        for err, count in sorted(distinct.items(),
+                                 key=lambda kv: -kv[1])[:5]:
+            print(f"  [{count}x] {err}")
+
+    print(f"\n\nGeneration complete!")
+    print(f"  Total time: {total_time/60:.1f} minutes")
+    print(f"  Successful: {completed:,}")
+    print(f"  Failed: {failed}")
+    print(f"  Rate: {completed/total_time:.1f} samples/second")
+
+    return completed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate synthetic gamma spectra v4'
+    )
+    parser.add_argument('--num_samples', '-n', type=int, default=200000,
+                        help='Number of samples to generate')
+    parser.add_argument('--output_dir', '-o', type=str, default='data/synthetic_v4',
+                        help='Output directory')
+    parser.add_argument('--detector', '-d', type=str, default='radiacode_103',
+                        help='Detector type')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='Number of parallel workers')
+    parser.add_argument('--seed', '-s', type=int, default=None,
+                        help='Random seed')
+    parser.add_argument('--activity_min', type=float, default=1.0,
+                        help='Minimum activity in Bq')
+    parser.add_argument('--activity_max', type=float, default=100.0,
+                        help='Maximum activity in Bq')
+
+    args = parser.parse_args()
+
+    generate_training_data_v4(
+        num_samples=args.num_samples,
+        output_dir=Path(args.output_dir),
+        detector_name=args.detector,
+        num_workers=args.workers,
+        random_seed=args.seed,
+        activity_range=(args.activity_min, args.activity_max),
+    )
+
+
+if __name__ == '__main__':
+    main()
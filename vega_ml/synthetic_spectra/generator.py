@@ -26,11 +26,13 @@ from .ground_truth import (
 from .physics import (
     PeakParameters,
     generate_peak_spectrum,
+    generate_peak_spectra,
     generate_environmental_background,
     apply_poisson_noise,
     apply_electronic_noise,
     normalize_spectrum,
 )
+from . import _kernels
 
 
 @dataclass
@@ -99,6 +101,33 @@ class GeneratedSpectrum:
     timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
 
 
+# Shared across all generator instances (and worker threads): the same
+# isotope template is rebuilt thousands of times over a 100k-sample run
+# otherwise. Keyed by (detector_name, isotope_name, include_daughters).
+_TEMPLATE_CACHE: Dict[Tuple[str, str, bool], np.ndarray] = {}
+
+
+def populate_template_cache(
+    isotope_names: List[str],
+    detector_config: Optional[DetectorConfig] = None,
+    include_daughters: bool = True
+) -> int:
+    """
+    Pre-build source templates for an isotope pool.
+
+    Worker startup hook: building every template before the hot loop
+    starts means no sample pays first-use construction cost.
+
+    Returns the number of templates now cached for the pool.
+    """
+    generator = SpectrumGenerator(detector_config=detector_config)
+    cached = 0
+    for name in isotope_names:
+        if generator.get_isotope_template(name, include_daughters) is not None:
+            cached += 1
+    return cached
+
+
 class SpectrumGenerator:
     """
     Main class for generating synthetic gamma spectra.
@@ -127,9 +156,58 @@ class SpectrumGenerator:
         self.detector_config = detector_config
         self.energy_bins = detector_config.get_energy_bins()
         self.num_channels = len(self.energy_bins)
-        
+
         if random_seed is not None:
             np.random.seed(random_seed)
+
+    def get_isotope_template(
+        self,
+        isotope_name: str,
+        include_daughters: bool = True
+    ) -> Optional[np.ndarray]:
+        """
+        Get the expected-counts template for 1 Bq * 1 s of an isotope.
+
+        Peak amplitudes are linear in activity and live time, so a single
+        per-unit template per isotope/detector pair can be scaled to any
+        activity and duration instead of regenerating every Gaussian peak
+        per sample per interval. Templates are cached at module level, so
+        every generator instance and worker thread shares one build.
+
+        Returns None for unknown isotopes.
+        """
+        key = (self.detector_config.name, isotope_name, include_daughters)
+        template = _TEMPLATE_CACHE.get(key)
+        if template is not None:
+            return template
+
+        isotope = get_isotope(isotope_name)
+        if isotope is None:
+            return None
+
+        emitters = [isotope]
+        if include_daughters and isotope.daughters:
+            emitters.extend(
+                d for d in (get_isotope(name) for name in isotope.daughters)
+                if d is not None
+            )
+
+        lines = [
+            gamma_line
+            for emitter in emitters
+            for gamma_line in emitter.gamma_lines
+        ]
+        template = generate_peak_spectra(
+            self.energy_bins,
+            np.array([line.energy_kev for line in lines]),
+            np.array([line.intensity for line in lines]),
+            activity_bq=1.0,
+            live_time_s=1.0,
+            detector_config=self.detector_config
+        )
+
+        _TEMPLATE_CACHE[key] = template
+        return template
     
     def generate_single_interval(
         self,
@@ -187,43 +265,27 @@ class SpectrumGenerator:
                 )
                 activity *= variation
             
-            # Add gamma lines from this isotope
-            for gamma_line in isotope.gamma_lines:
-                peak_params = PeakParameters(
-                    energy_kev=gamma_line.energy_kev,
-                    intensity=gamma_line.intensity,
-                    activity_bq=activity,
-                    live_time_s=interval_duration
-                )
-                
-                peak = generate_peak_spectrum(
-                    self.energy_bins,
-                    peak_params,
-                    self.detector_config
-                )
-                spectrum += peak
-            
+            # Collect every gamma line for this source (daughters share
+            # the parent activity - secular equilibrium assumed), then
+            # evaluate all peaks in one broadcast call
+            lines = list(isotope.gamma_lines)
             source_isotopes.append(source.isotope_name)
             
-            # Include daughters if requested
             if source.include_daughters and isotope.daughters:
                 for daughter_name in isotope.daughters:
                     daughter = get_isotope(daughter_name)
                     if daughter:
-                        for gamma_line in daughter.gamma_lines:
-                            peak_params = PeakParameters(
-                                energy_kev=gamma_line.energy_kev,
-                                intensity=gamma_line.intensity,
-                                activity_bq=activity,  # Secular equilibrium assumed
-                                live_time_s=interval_duration
-                            )
-                            peak = generate_peak_spectrum(
-                                self.energy_bins,
-                                peak_params,
-                                self.detector_config
-                            )
-                            spectrum += peak
+                        lines.extend(daughter.gamma_lines)
                         source_isotopes.append(daughter_name)
+            
+            spectrum += generate_peak_spectra(
+                self.energy_bins,
+                np.array([line.energy_kev for line in lines]),
+                np.array([line.intensity for line in lines]),
+                activity_bq=activity,
+                live_time_s=interval_duration,
+                detector_config=self.detector_config
+            )
         
         return spectrum, list(set(source_isotopes)), background_isotopes
     
@@ -251,20 +313,21 @@ class SpectrumGenerator:
             self.energy_bins = self.detector_config.get_energy_bins()
             self.num_channels = len(self.energy_bins)
         
-        # Initialize 2D array (time x channels)
-        spectrogram = np.zeros((num_intervals, self.num_channels))
-        
+        # Expected-rate matrix (time x channels) - noise is applied to the
+        # full matrix afterwards rather than row by row
+        rates = np.zeros((num_intervals, self.num_channels))
+
         all_source_isotopes = []
         all_background_isotopes = []
-        
-        # Generate each time interval
+
+        # Generate each time interval's expected rates
         background_config = {
             'background_cps': config.background_cps,
             'include_k40': config.include_k40,
             'include_radon': config.include_radon,
             'include_thorium': config.include_thorium,
         }
-        
+
         for i in range(num_intervals):
             spectrum, src_iso, bg_iso = self.generate_single_interval(
                 config.sources,
@@ -272,32 +335,60 @@ class SpectrumGenerator:
                 config.include_background,
                 background_config
             )
-            
-            # Apply noise
-            if config.apply_poisson:
-                spectrum = apply_poisson_noise(spectrum)
-            
-            if config.apply_electronic:
-                spectrum = apply_electronic_noise(
-                    spectrum,
-                    config.electronic_noise_sigma
-                )
-            
-            spectrogram[i, :] = spectrum
+
+            rates[i, :] = spectrum
             all_source_isotopes.extend(src_iso)
             all_background_isotopes.extend(bg_iso)
-        
-        # Normalize if requested
+
+        # One Poisson draw over the whole (T, channels) matrix: counts are
+        # independent per cell, so this matches T per-interval draws while
+        # keeping the PRNG work in a single vectorized call
+        if config.apply_poisson:
+            spectrogram = apply_poisson_noise(rates)
+        else:
+            spectrogram = rates
+
+        if config.apply_electronic:
+            spectrogram = apply_electronic_noise(
+                spectrogram,
+                config.electronic_noise_sigma
+            )
+
+        return self._package_spectrum(
+            config, spectrogram, all_source_isotopes,
+            all_background_isotopes, num_intervals
+        )
+
+    def _package_spectrum(
+        self,
+        config: SpectrumConfig,
+        spectrogram: np.ndarray,
+        source_isotopes: List[str],
+        background_isotopes: List[str],
+        num_intervals: int
+    ) -> GeneratedSpectrum:
+        """Normalize, label and wrap a raw spectrogram."""
+        # Normalize if requested; normalized data never needs float64
+        # precision, so store float32 and halve the bytes written
         if config.normalize:
-            spectrogram = normalize_spectrum(spectrogram, config.normalization_method)
-        
+            spectrogram = normalize_spectrum(
+                spectrogram, config.normalization_method
+            ).astype(np.float32)
+        elif config.apply_poisson and not config.apply_electronic:
+            # Raw Poisson counts are integers - pack them as the smallest
+            # unsigned dtype that fits instead of float64
+            if spectrogram.max() <= np.iinfo(np.uint16).max:
+                spectrogram = spectrogram.astype(np.uint16)
+            else:
+                spectrogram = spectrogram.astype(np.uint32)
+
         # Generate unique sample ID
         sample_id = self._generate_sample_id(config)
-        
+
         # Determine isotopes present
-        isotopes_present = list(set(all_source_isotopes))
-        background_isotopes = list(set(all_background_isotopes))
-        
+        isotopes_present = list(set(source_isotopes))
+        background_isotopes = list(set(background_isotopes))
+
         # Create labels
         labels = {
             'isotopes': isotopes_present,
@@ -311,8 +402,9 @@ class SpectrumGenerator:
             'detector': config.detector_name,
             'normalized': config.normalize,
             'normalization_method': config.normalization_method if config.normalize else None,
+            'dtype': str(spectrogram.dtype),
         }
-        
+
         return GeneratedSpectrum(
             data=spectrogram,
             config=config,
@@ -321,7 +413,130 @@ class SpectrumGenerator:
             labels=labels,
             sample_id=sample_id
         )
-    
+
+    def generate_batch(
+        self,
+        configs: List[SpectrumConfig]
+    ) -> List[GeneratedSpectrum]:
+        """
+        Generate many spectra, sharing source templates across samples.
+
+        Configs without per-interval activity variation take a vectorized
+        path: cached per-unit isotope templates are scaled by activity and
+        interval length, broadcast across all time intervals, and Poisson
+        counts for the whole (time x channels) matrix are drawn in one call.
+        Configs the fast path cannot express fall back to
+        generate_spectrum, so mixed batches are fine.
+
+        Args:
+            configs: List of spectrum configurations
+
+        Returns:
+            List of GeneratedSpectrum objects, one per config, in order
+        """
+        return [
+            self._generate_from_templates(config) or self.generate_spectrum(config)
+            for config in configs
+        ]
+
+    def _generate_from_templates(
+        self,
+        config: SpectrumConfig
+    ) -> Optional[GeneratedSpectrum]:
+        """Template-based fast path for generate_batch.
+
+        Returns None when the config needs the per-interval loop (activity
+        variation re-draws the source strength every interval).
+        """
+        if any(s.activity_variation > 0 for s in config.sources):
+            return None
+
+        num_intervals = int(config.duration_seconds / config.time_interval_seconds)
+        if num_intervals < 1:
+            num_intervals = 1
+
+        # Set detector config
+        if config.detector_name in RADIACODE_CONFIGS:
+            self.detector_config = RADIACODE_CONFIGS[config.detector_name]
+            self.energy_bins = self.detector_config.get_energy_bins()
+            self.num_channels = len(self.energy_bins)
+
+        # Deterministic source rate per interval, from cached templates.
+        # Structure-of-arrays accumulation: stack the templates and let
+        # one BLAS gemv (activities @ template matrix) replace the
+        # per-source add loop.
+        templates = []
+        activities = []
+        source_isotopes = []
+        for source in config.sources:
+            template = self.get_isotope_template(
+                source.isotope_name, source.include_daughters
+            )
+            if template is None:
+                print(f"Warning: Unknown isotope {source.isotope_name}")
+                continue
+            templates.append(template)
+            activities.append(source.activity_bq)
+            source_isotopes.append(source.isotope_name)
+            isotope = get_isotope(source.isotope_name)
+            if source.include_daughters and isotope.daughters:
+                source_isotopes.extend(
+                    name for name in isotope.daughters
+                    if get_isotope(name) is not None
+                )
+
+        if templates:
+            source_rate = np.asarray(activities) @ np.stack(templates)
+        else:
+            source_rate = np.zeros(self.num_channels)
+
+        # Per-interval background rows keep their random activity draws
+        background_rows = np.zeros((num_intervals, self.num_channels))
+        background_isotopes = []
+        if config.include_background:
+            for i in range(num_intervals):
+                bg_spectrum, bg_isotopes = generate_environmental_background(
+                    self.energy_bins,
+                    config.time_interval_seconds,
+                    background_cps=config.background_cps,
+                    include_k40=config.include_k40,
+                    include_radon=config.include_radon,
+                    include_thorium=config.include_thorium,
+                    detector_config=self.detector_config
+                )
+                background_rows[i] = bg_spectrum
+                background_isotopes = bg_isotopes
+
+        # One Poisson draw for the whole matrix (the per-row draws of the
+        # interval loop are distributionally identical). With numba the
+        # rate accumulation and the draw fuse into a single compiled pass
+        # that never materializes the rate matrix.
+        if config.apply_poisson and _kernels.HAS_NUMBA:
+            spectrogram = _kernels.sample_spectrogram_counts(
+                source_rate,
+                background_rows,
+                config.time_interval_seconds,
+                int(np.random.randint(0, 2**31 - 1))
+            ).astype(np.float64)
+        else:
+            rates = background_rows
+            rates += source_rate * config.time_interval_seconds
+            if config.apply_poisson:
+                spectrogram = apply_poisson_noise(rates)
+            else:
+                spectrogram = rates
+
+        if config.apply_electronic:
+            spectrogram = apply_electronic_noise(
+                spectrogram, config.electronic_noise_sigma
+            )
+
+        return self._package_spectrum(
+            config, spectrogram, source_isotopes,
+            background_isotopes, num_intervals
+        )
+
+
     def _generate_sample_id(self, config: SpectrumConfig) -> str:
         """Generate a unique sample ID from config."""
         # Create a hash from config parameters
@@ -390,6 +605,25 @@ class SpectrumGenerator:
         return self.generate_spectrum(config)
 
 
+def fast_save(path, arr: np.ndarray) -> None:
+    """
+    Write an array as .npy without the intermediate copy np.save makes.
+
+    Emits the standard NPY header via numpy.lib.format, then hands the
+    array's own buffer straight to the file object, so the result is
+    byte-compatible with np.save / np.load but skips the tobytes() copy.
+
+    Args:
+        path: Destination .npy file path
+        arr: Array to write (made C-contiguous if it is not already)
+    """
+    arr = np.ascontiguousarray(arr)
+    header = np.lib.format.header_data_from_array_1_0(arr)
+    with open(path, 'wb') as fp:
+        np.lib.format.write_array_header_1_0(fp, header)
+        fp.write(arr.data)
+
+
 def save_spectrum(
     spectrum: GeneratedSpectrum,
     output_dir: Path,
@@ -420,7 +654,7 @@ def save_spectrum(
     if save_image:
         if image_format in ('npy', 'both'):
             npy_path = output_dir / f"{base_name}.npy"
-            np.save(npy_path, spectrum.data)
+            fast_save(npy_path, spectrum.data)
             saved_files['npy'] = str(npy_path)
         
         if image_format in ('png', 'both'):
@@ -14,10 +14,15 @@ from .spectrum_physics import (
     calculate_fwhm,
     fwhm_to_sigma,
     detector_efficiency,
+    detector_efficiency_array,
     calculate_expected_counts,
     generate_peak_spectrum,
+    generate_peak_spectra,
+    generate_peak_spectra_fft,
     generate_compton_continuum,
     generate_exponential_background,
+    sample_continuum_energies,
+    sample_exponential_background,
     generate_polynomial_background,
     generate_environmental_background,
     apply_poisson_noise,
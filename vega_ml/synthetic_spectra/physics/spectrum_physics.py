@@ -218,6 +218,163 @@ def generate_peak_spectrum(
     return peak
 
 
+def detector_efficiency_array(
+    energies_kev: np.ndarray,
+    detector_config: Optional[DetectorConfig] = None
+) -> np.ndarray:
+    """
+    Vectorized detector_efficiency over an array of energies.
+
+    Same phenomenological model, evaluated for all energies at once.
+
+    Args:
+        energies_kev: Array of gamma energies in keV
+        detector_config: Detector configuration
+
+    Returns:
+        Array of efficiencies (0-1), one per energy
+    """
+    if detector_config is None:
+        detector_config = get_default_config()
+
+    energies_kev = np.asarray(energies_kev, dtype=np.float64)
+
+    low_eff = 1.0 - np.exp(-energies_kev / 50.0)
+    high_eff = np.exp(-energies_kev / 2000.0)
+    eff = 0.8 * low_eff * high_eff
+
+    volume_factor = (detector_config.detector_volume_cm3 / 1.0) ** (1 / 3)
+    eff *= min(1.0, volume_factor)
+
+    eff = np.clip(eff, 0.0, 1.0)
+    eff[energies_kev < 20] = 0.0
+    return eff
+
+
+def generate_peak_spectra(
+    energy_bins: np.ndarray,
+    energies_kev: np.ndarray,
+    intensities: np.ndarray,
+    activity_bq: float,
+    live_time_s: float,
+    detector_config: Optional[DetectorConfig] = None
+) -> np.ndarray:
+    """
+    Generate the summed detector response for many gamma lines at once.
+
+    Broadcasts all lines against the energy bins in one fused kernel:
+    z = (bins - mu[:, None]) / sigma[:, None], exp(-z^2/2) weighted by
+    per-line amplitude, then summed over lines. Equivalent to summing
+    generate_peak_spectrum over each line, without the per-line Python
+    loop.
+
+    Args:
+        energy_bins: Array of energy bin centers (keV)
+        energies_kev: Gamma line energies (keV), shape (L,)
+        intensities: Emission probabilities per line, shape (L,)
+        activity_bq: Source activity (Bq), applied to every line
+        live_time_s: Live time (s)
+        detector_config: Detector configuration
+
+    Returns:
+        Array of expected counts in each bin (not yet Poisson sampled)
+    """
+    if detector_config is None:
+        detector_config = get_default_config()
+
+    energies_kev = np.asarray(energies_kev, dtype=np.float64)
+    intensities = np.asarray(intensities, dtype=np.float64)
+    if energies_kev.size == 0:
+        return np.zeros_like(energy_bins)
+
+    efficiency = detector_efficiency_array(energies_kev, detector_config)
+    amplitudes = activity_bq * live_time_s * intensities * efficiency
+
+    # calculate_fwhm / fwhm_to_sigma, vectorized over all lines
+    fwhm_kev = detector_config.fwhm_at_662 * np.sqrt(662.0 * energies_kev)
+    sigma = fwhm_to_sigma(fwhm_kev)
+
+    bin_width = energy_bins[1] - energy_bins[0] if len(energy_bins) > 1 else 1.0
+    z = (energy_bins[None, :] - energies_kev[:, None]) / sigma[:, None]
+    weights = amplitudes * bin_width / (sigma * np.sqrt(2 * np.pi))
+    response = weights[:, None] * np.exp(-0.5 * z * z)
+
+    return response.sum(axis=0)
+
+
+def generate_peak_spectra_fft(
+    energy_bins: np.ndarray,
+    energies_kev: np.ndarray,
+    intensities: np.ndarray,
+    activity_bq: float,
+    live_time_s: float,
+    detector_config: Optional[DetectorConfig] = None
+) -> np.ndarray:
+    """
+    Approximate many-line detector response via one FFT convolution.
+
+    Places each line's expected counts as a delta at its nearest channel
+    and convolves the whole comb with a single Gaussian kernel at the
+    intensity-weighted mean resolution, in O(N log N) regardless of line
+    count. Total counts are conserved.
+
+    This is an approximation: real resolution varies as sqrt(E), so
+    individual peak widths are slightly off versus the exact per-line
+    broadcast in generate_peak_spectra. Use it when line count dwarfs
+    accuracy needs (dense chains, quick-look tooling); the generator's
+    cached templates keep using the exact path.
+
+    Args:
+        energy_bins: Array of energy bin centers (keV), uniform spacing
+        energies_kev: Gamma line energies (keV), shape (L,)
+        intensities: Emission probabilities per line, shape (L,)
+        activity_bq: Source activity (Bq)
+        live_time_s: Live time (s)
+        detector_config: Detector configuration
+
+    Returns:
+        Array of expected counts in each bin (not yet Poisson sampled)
+    """
+    if detector_config is None:
+        detector_config = get_default_config()
+
+    energies_kev = np.asarray(energies_kev, dtype=np.float64)
+    intensities = np.asarray(intensities, dtype=np.float64)
+    if energies_kev.size == 0:
+        return np.zeros_like(energy_bins)
+
+    num_channels = len(energy_bins)
+    bin_width = energy_bins[1] - energy_bins[0] if num_channels > 1 else 1.0
+
+    efficiency = detector_efficiency_array(energies_kev, detector_config)
+    amplitudes = activity_bq * live_time_s * intensities * efficiency
+
+    # Delta comb: each line's total counts at its nearest channel
+    idx = np.clip(
+        np.round((energies_kev - energy_bins[0]) / bin_width),
+        0, num_channels - 1
+    ).astype(np.intp)
+    comb = np.zeros(num_channels)
+    np.add.at(comb, idx, amplitudes)
+
+    # One kernel at the amplitude-weighted mean energy's resolution
+    weights = amplitudes if amplitudes.sum() > 0 else np.ones_like(amplitudes)
+    mean_energy = float(np.average(energies_kev, weights=weights))
+    sigma_kev = fwhm_to_sigma(
+        detector_config.fwhm_at_662 * np.sqrt(662.0 * mean_energy)
+    )
+
+    offsets = (np.arange(num_channels) - num_channels // 2) * bin_width
+    kernel = np.exp(-0.5 * (offsets / sigma_kev) ** 2)
+    kernel /= kernel.sum()
+
+    spectrum = np.fft.irfft(
+        np.fft.rfft(comb) * np.fft.rfft(np.fft.ifftshift(kernel)),
+        n=num_channels
+    )
+    return np.maximum(0.0, spectrum)
+
+
 def generate_compton_continuum(
     energy_bins: np.ndarray,
     peak_energy: float,
@@ -288,6 +445,77 @@ def generate_exponential_background(
     return amplitude * np.exp(-decay_constant * energy_bins)
 
 
+def sample_continuum_energies(
+    n: int,
+    characteristic_energy_kev: float,
+    order: int = 1,
+    rng: Optional[np.random.Generator] = None
+) -> np.ndarray:
+    """
+    Sample photon energies from an E^(order-1) * exp(-E/T) continuum.
+
+    Uses the sum-of-logs trick: the sum of `order` draws of -ln(u),
+    u uniform on (0,1], follows a Gamma(order) distribution, so
+    E = -(ln u1 + ... + ln u_order) * T samples the continuum shape
+    directly. One vectorized op, no PDF inversion or rejection loop.
+
+    order=1 gives the exponential background shape used by
+    generate_exponential_background; order=2 and 3 give the
+    x*exp(-x) and x^2*exp(-x) bremsstrahlung-like shapes.
+
+    Args:
+        n: Number of photon energies to sample
+        characteristic_energy_kev: Scale T of the continuum (keV);
+            1/decay_constant for the exponential background
+        order: Poisson order of the convolution (1, 2, or 3 typical)
+        rng: Generator to draw from (default: fresh default_rng)
+
+    Returns:
+        Array of n sampled energies in keV
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    u = rng.random((order, n))
+    return -np.log(u).sum(axis=0) * characteristic_energy_kev
+
+
+def sample_exponential_background(
+    energy_bins: np.ndarray,
+    total_counts: float,
+    decay_constant: float = 0.003,
+    rng: Optional[np.random.Generator] = None
+) -> np.ndarray:
+    """
+    Generate an event-sampled exponential background.
+
+    Draws individual photon energies with sample_continuum_energies and
+    histograms them into the energy bins, so per-channel counts carry
+    Poisson statistics already - do not apply apply_poisson_noise on top.
+
+    Args:
+        energy_bins: Array of energy bin centers (keV)
+        total_counts: Expected total photon count in the continuum
+        decay_constant: Exponential decay constant (1/keV)
+        rng: Generator to draw from (default: fresh default_rng)
+
+    Returns:
+        Array of integer background counts per channel
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    n = rng.poisson(max(0.0, total_counts))
+    energies = sample_continuum_energies(n, 1.0 / decay_constant, rng=rng)
+
+    # Bin edges from bin centers (uniform binning assumed)
+    half_width = (energy_bins[1] - energy_bins[0]) / 2.0
+    edges = np.concatenate([energy_bins - half_width,
+                            [energy_bins[-1] + half_width]])
+    counts, _ = np.histogram(energies, bins=edges)
+    return counts.astype(np.float64)
+
+
 def generate_polynomial_background(
     energy_bins: np.ndarray,
     coefficients: List[float] = None
@@ -332,6 +560,11 @@ def generate_environmental_background(
     - Radon daughters (Pb-214, Bi-214) - indoor air
     - Thorium daughters (Pb-212, Tl-208) - building materials
     
+    Each component's shape is fixed; only its intensity varies per call.
+    The shapes are therefore built once per detector and composed as
+    scalar-times-vector additions instead of regenerating every Gaussian
+    peak on each call.
+    
     Args:
         energy_bins: Array of energy bin centers (keV)
         duration_seconds: Acquisition time
@@ -347,120 +580,91 @@ def generate_environmental_background(
     if detector_config is None:
         detector_config = get_default_config()
     
+    templates = _get_background_templates(energy_bins, detector_config)
     background_isotopes = []
     
-    # Start with exponential continuum
+    # Exponential continuum, scaled to the target count rate
     total_continuum_counts = background_cps * duration_seconds * 0.7
-    background = generate_exponential_background(
-        energy_bins,
-        amplitude=total_continuum_counts / 500,
-        decay_constant=0.002
-    )
+    background = total_continuum_counts * templates['continuum']
     
-    # Normalize continuum to target count rate
-    if background.sum() > 0:
-        background *= (total_continuum_counts / background.sum())
-    
-    # Add K-40 peak (very common)
+    # Peak components: unit template (1 Bq * 1 s) scaled by a randomly
+    # drawn activity and the live time
     if include_k40:
         k40_activity = np.random.uniform(0.5, 5.0)  # Bq
-        peak = generate_peak_spectrum(
-            energy_bins,
-            PeakParameters(
-                energy_kev=1460.83,
-                intensity=0.1066,
-                activity_bq=k40_activity,
-                live_time_s=duration_seconds
-            ),
-            detector_config
+        background = background + (
+            k40_activity * duration_seconds * templates['k40']
         )
-        background += peak
         background_isotopes.append("K-40")
     
-    # Add radon daughters
     if include_radon:
         radon_activity = np.random.uniform(0.1, 2.0)  # Bq
-        
-        # Pb-214 lines
-        for energy, intensity in [(295.22, 0.1842), (351.93, 0.356)]:
-            peak = generate_peak_spectrum(
-                energy_bins,
-                PeakParameters(
-                    energy_kev=energy,
-                    intensity=intensity,
-                    activity_bq=radon_activity,
-                    live_time_s=duration_seconds
-                ),
-                detector_config
-            )
-            background += peak
-        
-        # Bi-214 lines
-        for energy, intensity in [(609.31, 0.4549), (1120.29, 0.1492), (1764.49, 0.1531)]:
-            peak = generate_peak_spectrum(
-                energy_bins,
-                PeakParameters(
-                    energy_kev=energy,
-                    intensity=intensity,
-                    activity_bq=radon_activity,
-                    live_time_s=duration_seconds
-                ),
-                detector_config
-            )
-            background += peak
-        
+        background += radon_activity * duration_seconds * templates['radon']
         background_isotopes.extend(["Pb-214", "Bi-214"])
     
-    # Add thorium daughters
     if include_thorium:
         thorium_activity = np.random.uniform(0.05, 1.0)  # Bq
-        
-        # Ac-228 line
-        peak = generate_peak_spectrum(
-            energy_bins,
-            PeakParameters(
-                energy_kev=911.20,
-                intensity=0.258,
-                activity_bq=thorium_activity,
-                live_time_s=duration_seconds
-            ),
-            detector_config
-        )
-        background += peak
-        
-        # Pb-212 line
-        peak = generate_peak_spectrum(
-            energy_bins,
-            PeakParameters(
-                energy_kev=238.63,
-                intensity=0.436,
-                activity_bq=thorium_activity,
-                live_time_s=duration_seconds
-            ),
-            detector_config
-        )
-        background += peak
-        
-        # Tl-208 lines
-        for energy, intensity in [(583.19, 0.845 * 0.36), (2614.51, 0.998 * 0.36)]:
-            # Branching ratio of 36% for Tl-208 path
-            peak = generate_peak_spectrum(
-                energy_bins,
-                PeakParameters(
-                    energy_kev=energy,
-                    intensity=intensity,
-                    activity_bq=thorium_activity,
-                    live_time_s=duration_seconds
-                ),
-                detector_config
-            )
-            background += peak
-        
+        background += thorium_activity * duration_seconds * templates['thorium']
         background_isotopes.extend(["Ac-228", "Pb-212", "Tl-208"])
     
     return background, background_isotopes
 
 
+# Background component shapes per detector; see
+# generate_environmental_background
+_BG_TEMPLATE_CACHE: dict = {}
+
+# (energy_kev, intensity) per component; Tl-208 lines include the 36%
+# branching of the thorium chain
+_K40_LINES = [(1460.83, 0.1066)]
+_RADON_LINES = [
+    (295.22, 0.1842), (351.93, 0.356),                      # Pb-214
+    (609.31, 0.4549), (1120.29, 0.1492), (1764.49, 0.1531)  # Bi-214
+]
+_THORIUM_LINES = [
+    (911.20, 0.258),                                # Ac-228
+    (238.63, 0.436),                                # Pb-212
+    (583.19, 0.845 * 0.36), (2614.51, 0.998 * 0.36)  # Tl-208
+]
+
+
+def _get_background_templates(
+    energy_bins: np.ndarray,
+    detector_config: DetectorConfig
+) -> dict:
+    """Build (once per detector) the unit background component shapes."""
+    key = detector_config.name
+    templates = _BG_TEMPLATE_CACHE.get(key)
+    if templates is not None:
+        return templates
+    
+    # Continuum shape normalized to unit sum, so scaling by the target
+    # count total reproduces the normalized exponential exactly
+    continuum = generate_exponential_background(
+        energy_bins, amplitude=1.0, decay_constant=0.002
+    )
+    if continuum.sum() > 0:
+        continuum /= continuum.sum()
+    
+    def peak_sum(lines):
+        return generate_peak_spectra(
+            energy_bins,
+            np.array([e for e, _ in lines]),
+            np.array([i for _, i in lines]),
+            activity_bq=1.0,
+            live_time_s=1.0,
+            detector_config=detector_config
+        )
+    
+    templates = {
+        'continuum': continuum,
+        'k40': peak_sum(_K40_LINES),
+        'radon': peak_sum(_RADON_LINES),
+        'thorium': peak_sum(_THORIUM_LINES),
+    }
+    _BG_TEMPLATE_CACHE[key] = templates
+    return templates
+
+
 def apply_poisson_noise(spectrum: np.ndarray) -> np.ndarray:
     """
     Apply Poisson counting statistics to a spectrum.
@@ -0,0 +1,105 @@
+"""
+Offline PNG Rendering
+
+Renders spectrogram PNGs as a post-pass over already-generated data, so
+the generation hot loop never touches image libraries. One matplotlib
+figure is created and reused for every sample instead of allocating a
+fresh figure per image.
+
+Usage:
+    python render_pngs.py --input_dir ./data/synthetic
+    python render_pngs.py --input_dir ./data/synthetic --sharded
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from synthetic_spectra.shards import SpectrumShardReader
+
+
+def iter_npy_samples(spectra_dir: Path):
+    """Yield (sample_name, data) for every .npy spectrum in a directory."""
+    for npy_path in sorted(spectra_dir.glob("*.npy")):
+        yield npy_path.stem, np.load(npy_path, mmap_mode='r')
+
+
+def iter_shard_samples(shard_dir: Path):
+    """Yield (sample_name, data) for every sample in a shard directory."""
+    reader = SpectrumShardReader(shard_dir)
+    for sample_id, data, _labels in reader:
+        yield f"spectrum_{sample_id}", data
+
+
+def render_pngs(samples, output_dir: Path) -> int:
+    """
+    Render one PNG per sample, reusing a single figure throughout.
+
+    Args:
+        samples: Iterable of (name, 2D array) pairs
+        output_dir: Directory for the rendered PNGs
+
+    Returns:
+        Number of images rendered
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    fig, ax = plt.subplots(figsize=(10, 4))
+    rendered = 0
+
+    for name, data in samples:
+        ax.cla()
+        ax.imshow(data, aspect='auto', cmap='viridis', origin='lower')
+        ax.set_xlabel('Energy channel')
+        ax.set_ylabel('Time interval')
+        ax.set_title(name)
+        fig.savefig(output_dir / f"{name}.png", dpi=100,
+                    bbox_inches='tight')
+        rendered += 1
+
+        if rendered % 100 == 0:
+            print(f"  Rendered {rendered} images...")
+
+    plt.close(fig)
+    return rendered
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render spectrogram PNGs from generated data"
+    )
+    parser.add_argument("--input_dir", "-i", type=str, required=True,
+                        help="Generation output directory")
+    parser.add_argument("--output_dir", "-o", type=str, default=None,
+                        help="PNG output directory (default: input_dir/png)")
+    parser.add_argument("--sharded", action="store_true",
+                        help="Read samples from input_dir/shards instead "
+                             "of input_dir/spectra/*.npy")
+
+    args = parser.parse_args()
+
+    input_dir = Path(args.input_dir)
+    output_dir = Path(args.output_dir) if args.output_dir else input_dir / "png"
+
+    if args.sharded:
+        samples = iter_shard_samples(input_dir / "shards")
+    else:
+        samples = iter_npy_samples(input_dir / "spectra")
+
+    rendered = render_pngs(samples, output_dir)
+    print(f"Rendered {rendered} images to {output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
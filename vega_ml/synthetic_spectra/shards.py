@@ -0,0 +1,292 @@
+"""
+Sharded Spectrum Storage
+
+Bundles many generated spectra into a few large per-worker shard files
+instead of one .npy + one .json per sample. At 100k+ samples the
+one-file-per-sample layout makes filesystem metadata the bottleneck;
+shards cut the inode/dentry operations by orders of magnitude and keep
+writes sequential.
+
+Layout under <output_dir>/shards/:
+    worker_<id>.bin  - raw sample arrays, appended back to back
+    worker_<id>.idx  - one JSON line per sample: offset, nbytes, shape,
+                       dtype, sample_id, labels
+    manifest.json    - merged index mapping sample_id -> location,
+                       written once after generation finishes
+
+SpectrumShardReader mmaps the .bin files, so loading a sample is a
+zero-copy slice into the page cache.
+
+Per-worker shards were chosen over one single (num_samples, ...) memmap
+for the whole run: they give the same O(1) directory-metadata profile
+while letting workers write without coordinating row ownership, and a
+crashed run keeps every completed shard.
+"""
+
+import atexit
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+class SpectrumShardWriter:
+    """
+    Appends sample arrays to one shard file, one writer per worker.
+
+    Each add() appends the raw array bytes to the .bin file and one JSON
+    index line to the .idx file, flushing both so a crashed worker loses
+    at most the sample in flight.
+    """
+
+    def __init__(self, shard_dir: Path, worker_id: Optional[int] = None):
+        self.shard_dir = Path(shard_dir)
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+
+        self.worker_id = worker_id if worker_id is not None else os.getpid()
+        self.bin_path = self.shard_dir / f"worker_{self.worker_id}.bin"
+        self.idx_path = self.shard_dir / f"worker_{self.worker_id}.idx"
+
+        self._bin = open(self.bin_path, 'ab')
+        self._idx = open(self.idx_path, 'a')
+        self._offset = self._bin.tell()
+
+    def add(self, sample_id: str, data: np.ndarray, labels: Dict) -> None:
+        """Append one sample's array and index entry to the shard."""
+        data = np.ascontiguousarray(data)
+
+        self._bin.write(data.data)
+        self._idx.write(json.dumps({
+            'sample_id': sample_id,
+            'offset': self._offset,
+            'nbytes': data.nbytes,
+            'shape': list(data.shape),
+            'dtype': str(data.dtype),
+            'labels': labels,
+        }) + "\n")
+        self._bin.flush()
+        self._idx.flush()
+        self._offset += data.nbytes
+
+    def close(self) -> None:
+        self._bin.close()
+        self._idx.close()
+
+
+class SpectrumMemmapShardWriter:
+    """
+    Fixed-shape shard backed by a memmapped .npy file.
+
+    Samples are written directly into rows of a preallocated
+    (capacity, *sample_shape) array, so there is no per-sample
+    serialization - the OS flushes dirty pages in the background. When a
+    shard fills, the writer rolls over to a new part file; a final
+    partial shard is compacted to its real length on close().
+
+    Requires every sample to share one shape and dtype (the v3 pipeline
+    generates fixed 60 x 1023 spectrograms). Use SpectrumShardWriter for
+    variable-shape streams.
+    """
+
+    def __init__(self, shard_dir: Path, sample_shape: Tuple[int, ...],
+                 dtype, capacity: int = 1000,
+                 worker_id: Optional[int] = None):
+        self.shard_dir = Path(shard_dir)
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+
+        self.worker_id = worker_id if worker_id is not None else os.getpid()
+        self.sample_shape = tuple(sample_shape)
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+
+        self.idx_path = self.shard_dir / f"worker_{self.worker_id}.idx"
+        self._idx = open(self.idx_path, 'a')
+
+        self._part = 0
+        self._row = 0
+        self._mm = None
+        self._open_part()
+
+    def _part_name(self) -> str:
+        return f"worker_{self.worker_id}_part{self._part}.npy"
+
+    def _open_part(self) -> None:
+        self._mm = np.lib.format.open_memmap(
+            self.shard_dir / self._part_name(), mode='w+',
+            dtype=self.dtype, shape=(self.capacity,) + self.sample_shape
+        )
+        self._row = 0
+
+    def add(self, sample_id: str, data: np.ndarray, labels: Dict) -> None:
+        """Write one sample into the current shard row."""
+        if data.shape != self.sample_shape or data.dtype != self.dtype:
+            raise ValueError(
+                f"sample {sample_id} has shape {data.shape} dtype "
+                f"{data.dtype}, writer expects {self.sample_shape} "
+                f"{self.dtype}"
+            )
+
+        if self._row >= self.capacity:
+            self._mm.flush()
+            self._part += 1
+            self._open_part()
+
+        self._mm[self._row] = data
+        self._idx.write(json.dumps({
+            'sample_id': sample_id,
+            'shard': self._part_name(),
+            'row': self._row,
+            'labels': labels,
+        }) + "\n")
+        self._idx.flush()
+        self._row += 1
+
+    def close(self) -> None:
+        """Flush, compacting a partially filled final shard."""
+        self._mm.flush()
+        if 0 < self._row < self.capacity:
+            # Rewrite the last part at its true length so readers see the
+            # correct shape
+            path = self.shard_dir / self._part_name()
+            compact = np.array(self._mm[:self._row])
+            del self._mm
+            np.save(path, compact)
+        self._idx.close()
+
+
+# Per-process writer caches so pool workers reuse one open shard across
+# all the samples they generate
+_WORKER_WRITERS: Dict[Tuple[int, str], SpectrumShardWriter] = {}
+_WORKER_MEMMAP_WRITERS: Dict[Tuple[int, str], SpectrumMemmapShardWriter] = {}
+
+
+def get_worker_writer(shard_dir) -> SpectrumShardWriter:
+    """Return this process's shard writer, creating it on first use."""
+    key = (os.getpid(), str(shard_dir))
+    writer = _WORKER_WRITERS.get(key)
+    if writer is None:
+        writer = SpectrumShardWriter(shard_dir)
+        _WORKER_WRITERS[key] = writer
+    return writer
+
+
+def get_worker_memmap_writer(shard_dir, sample_shape,
+                             dtype) -> SpectrumMemmapShardWriter:
+    """Return this process's memmap shard writer, creating it on first
+    use and registering a close at interpreter exit."""
+    key = (os.getpid(), str(shard_dir))
+    writer = _WORKER_MEMMAP_WRITERS.get(key)
+    if writer is None:
+        writer = SpectrumMemmapShardWriter(shard_dir, sample_shape, dtype)
+        _WORKER_MEMMAP_WRITERS[key] = writer
+        atexit.register(writer.close)
+    return writer
+
+
+def write_manifest(shard_dir) -> Path:
+    """
+    Merge all worker .idx files into a single manifest.json.
+
+    Returns the manifest path. Safe to re-run; the manifest is rebuilt
+    from the .idx files each time.
+    """
+    shard_dir = Path(shard_dir)
+    samples = {}
+    for idx_path in sorted(shard_dir.glob("worker_*.idx")):
+        shard_file = idx_path.with_suffix('.bin').name
+        with open(idx_path) as f:
+            for line in f:
+                entry = json.loads(line)
+                # Memmap-shard entries already carry their part file name
+                entry.setdefault('shard', shard_file)
+                samples[entry.pop('sample_id')] = entry
+
+    _compact_memmap_shards(shard_dir, samples)
+
+    manifest_path = shard_dir / "manifest.json"
+    with open(manifest_path, 'w') as f:
+        json.dump({'num_samples': len(samples), 'samples': samples}, f)
+    return manifest_path
+
+
+def _compact_memmap_shards(shard_dir: Path, samples: Dict) -> None:
+    """
+    Trim memmap shards down to their used rows.
+
+    Pool worker processes exit without running atexit handlers, so a
+    partially filled final part keeps its preallocated capacity; the
+    merge step truncates it to the highest indexed row.
+    """
+    used_rows: Dict[str, int] = {}
+    for entry in samples.values():
+        if 'row' in entry:
+            used_rows[entry['shard']] = max(
+                used_rows.get(entry['shard'], 0), entry['row'] + 1
+            )
+
+    for shard_file, rows in used_rows.items():
+        path = shard_dir / shard_file
+        if not path.exists():
+            continue
+        mm = np.load(path, mmap_mode='r')
+        if mm.shape[0] > rows:
+            compact = np.array(mm[:rows])
+            del mm
+            np.save(path, compact)
+
+
+class SpectrumShardReader:
+    """
+    Zero-copy reader over a shard directory.
+
+    mmaps each .bin once and serves samples as array views into the
+    mapped pages, so repeated loads cost no read() copies.
+    """
+
+    def __init__(self, shard_dir):
+        self.shard_dir = Path(shard_dir)
+        manifest_path = self.shard_dir / "manifest.json"
+        if not manifest_path.exists():
+            write_manifest(self.shard_dir)
+
+        with open(manifest_path) as f:
+            self._samples = json.load(f)['samples']
+
+        self._mmaps: Dict[str, np.memmap] = {}
+        self._npy_mmaps: Dict[str, np.ndarray] = {}
+
+    def _shard_mmap(self, shard_file: str) -> np.memmap:
+        mm = self._mmaps.get(shard_file)
+        if mm is None:
+            mm = np.memmap(self.shard_dir / shard_file, dtype=np.uint8,
+                           mode='r')
+            self._mmaps[shard_file] = mm
+        return mm
+
+    def load(self, sample_id: str) -> Tuple[np.ndarray, Dict]:
+        """Return (data, labels) for one sample as a view into the shard."""
+        entry = self._samples[sample_id]
+        if 'row' in entry:
+            # Memmap shard: one .npy holding (capacity, ...) rows
+            mm = self._npy_mmaps.get(entry['shard'])
+            if mm is None:
+                mm = np.load(self.shard_dir / entry['shard'], mmap_mode='r')
+                self._npy_mmaps[entry['shard']] = mm
+            return mm[entry['row']], entry['labels']
+        mm = self._shard_mmap(entry['shard'])
+        raw = mm[entry['offset']:entry['offset'] + entry['nbytes']]
+        data = raw.view(entry['dtype']).reshape(entry['shape'])
+        return data, entry['labels']
+
+    def sample_ids(self) -> List[str]:
+        return list(self._samples.keys())
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def __iter__(self) -> Iterator[Tuple[str, np.ndarray, Dict]]:
+        for sample_id in self._samples:
+            data, labels = self.load(sample_id)
+            yield sample_id, data, labels
@@ -68,25 +68,26 @@ class SpectrumDataset2D(Dataset):
         else:
             self.metadata = self._load_metadata()
             self.sample_ids = list(self.metadata['samples'].keys())
-            print(f"Using combined labels.json (legacy mode)")
+            print(f"Using combined labels file")
         
         print(f"Loaded 2D dataset with {len(self.sample_ids)} samples")
         print(f"Target shape: ({target_time_intervals}, 1023)")
         print(f"Isotope index has {self.isotope_index.num_isotopes} isotopes")
     
     def _detect_label_format(self) -> bool:
-        """Detect whether to use individual JSON files or combined labels.json."""
+        """Detect whether to use individual JSON files or a combined labels file."""
         json_files = list(self.spectra_dir.glob("spectrum_*.json"))
         if len(json_files) > 0:
             return True
         
-        labels_path = self.data_dir / "labels.json"
-        if labels_path.exists():
+        if (self.data_dir / "labels.jsonl").exists() or \
+                (self.data_dir / "labels.json").exists():
             return False
         
         raise FileNotFoundError(
-            f"No label files found. Expected either:\n"
+            f"No label files found. Expected one of:\n"
             f"  - Individual files: {self.spectra_dir}/spectrum_*.json\n"
+            f"  - Merged log: {self.data_dir}/labels.jsonl\n"
             f"  - Combined file: {self.data_dir}/labels.json"
         )
     
@@ -101,7 +102,17 @@ class SpectrumDataset2D(Dataset):
         return sample_ids
     
     def _load_metadata(self) -> Dict:
-        """Load the combined labels.json metadata file."""
+        """Load the combined labels file (labels.jsonl or legacy labels.json)."""
+        jsonl_path = self.data_dir / "labels.jsonl"
+        if jsonl_path.exists():
+            # v2 generator output: one {'sample_id': ..., <labels>} per line
+            samples = {}
+            with open(jsonl_path, 'r') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    samples[entry.pop('sample_id')] = entry
+            return {'samples': samples}
+        
         labels_path = self.data_dir / "labels.json"
         if not labels_path.exists():
             raise FileNotFoundError(f"Labels file not found: {labels_path}")